@@ -10,36 +10,28 @@
 # along with this library; if not, write to the Free Software
 # Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
 
+from perf import mark
+
 import gi
 gi.require_version('Gtk', '3.0')
 
 from gi.repository import Gtk, Gdk
 
-import sugar3
 from sugar3.activity import activity
 from sugar3 import profile
 from sugar3.graphics.toolbarbox import ToolbarBox
-from sugar3.bundle.activitybundle import ActivityBundle
 from sugar3.activity.widgets import ActivityToolbarButton
 from sugar3.activity.widgets import StopButton
-from sugar3.graphics.toolbarbox import ToolbarButton
-
-from sugar3.graphics.toolbutton import ToolButton
-from sugar3.graphics.menuitem import MenuItem
-from sugar3.graphics.icon import Icon
-from sugar3.datastore import datastore
-from sugar3.graphics.objectchooser import ObjectChooser
 
-from toolbar_utils import button_factory, image_factory, label_factory, \
+from toolbar_utils import button_factory, label_factory, \
     separator_factory, radio_factory
 
+import os
+
 from gettext import gettext as _
-import locale
-import os.path
 
 from game import Game
-from genxo import generate_xo
-from utils import svg_str_to_pixbuf
+from utils import json_load, json_dump
 
 import logging
 _logger = logging.getLogger('turtle-in-a-pond-activity')
@@ -48,8 +40,11 @@ BEGINNER = 0
 INTERMEDIATE = 1
 EXPERT = 2
 CUSTOM = 3
+MASTER = 4
 LEVEL_LABELS = [_('Beginner'), _('Intermediate'), _('Expert'),
-                _('My strategy')]
+                _('My strategy'), _('Master')]
+
+mark('imports')
 
 
 class TurtlePondActivity(activity.Activity):
@@ -57,6 +52,9 @@ class TurtlePondActivity(activity.Activity):
 
     def __init__(self, handle):
         """ Initialize the toolbars and the game board """
+        # Showing the window can read the Journal before there is a game
+        self._saved_state = None
+        self._restoring = False
         super(TurtlePondActivity, self).__init__(handle)
         self.nick = profile.get_nick_name()
         if profile.get_color() is not None:
@@ -65,6 +63,7 @@ class TurtlePondActivity(activity.Activity):
             self.colors = ['#A0FFA0', '#FF8080']
 
         self._setup_toolbars()
+        mark('toolbar')
 
         # Create a canvas
         canvas = Gtk.DrawingArea()
@@ -75,9 +74,13 @@ class TurtlePondActivity(activity.Activity):
         self.show_all()
 
         self._game = Game(canvas, parent=self, colors=self.colors)
+        mark('board')
+        self._first_draw_id = canvas.connect_after('draw',
+                                                   self._first_draw_cb)
 
-        # TODO: Restore game state from Journal or start new game
-        self._game.new_game()
+        # Restore game state from Journal or start new game
+        self._autosaved = self._game.load_autosave()
+        self._restore()
 
     def _setup_toolbars(self):
         """ Setup the toolbars. """
@@ -123,6 +126,13 @@ class TurtlePondActivity(activity.Activity):
             cb_arg=EXPERT,
             tooltip=LEVEL_LABELS[EXPERT],
             group=self.beginner_button)
+        self.master_button = radio_factory(
+            'master',
+            self.toolbar,
+            self._level_cb,
+            cb_arg=MASTER,
+            tooltip=LEVEL_LABELS[MASTER],
+            group=self.beginner_button)
         self.custom_button = radio_factory(
             'view-source',
             self.toolbar,
@@ -140,12 +150,27 @@ class TurtlePondActivity(activity.Activity):
             self._do_load_python_cb,
             tooltip=_('Load strategy from Journal'))
 
+        self._profile_button = button_factory(
+            'profile', self.toolbar, self._profile_cb,
+            tooltip=_('Time the turtle\'s moves'))
+
+        self._export_profile_button = button_factory(
+            'profile-export', self.toolbar, self._export_profile_cb,
+            tooltip=_('Save the timings to the Journal'))
+
         stop_button = StopButton(self)
         stop_button.props.accelerator = '<Ctrl>q'
         toolbox.toolbar.insert(stop_button, -1)
         stop_button.show()
 
+    def _first_draw_cb(self, canvas, cr):
+        ''' Note when the first frame has been painted '''
+        canvas.disconnect(self._first_draw_id)
+        mark('first-frame')
+
     def _level_cb(self, button, level):
+        if self._restoring:
+            return
         if level == CUSTOM and self._game.strategies[CUSTOM] is None:
             level = EXPERT
             self.expert_button.set_active(True)
@@ -162,11 +187,45 @@ class TurtlePondActivity(activity.Activity):
 
     def write_file(self, file_path):
         """ Write the grid status to the Journal """
-        return
+        self._game.flush_move_log()
+        self._game.flush_stats()
+        with open(file_path, 'w') as fp:
+            fp.write(json_dump(self._game.get_state()))
+
+    def read_file(self, file_path):
+        """ Read the grid status back from the Journal """
+        try:
+            with open(file_path, 'r') as fp:
+                state = json_load(fp.read())
+        except (IOError, ValueError) as e:
+            _logger.debug('cannot read {}: {}'.format(file_path, e))
+            return
+        if not isinstance(state, dict):
+            return
+        self._saved_state = state
+        if hasattr(self, '_autosaved'):
+            self._restore()
 
     def _restore(self):
-        """ Restore the game state from metadata """
-        return
+        """ Restore the game state from the Journal, or from the
+        autosave if this activity got further before it was stopped """
+        state = self._saved_state
+        autosaved = self._autosaved
+        if autosaved is not None and \
+           autosaved.get('activity') == self.get_id() and \
+           autosaved.get('saved', 0) > (state or {}).get('saved', 0):
+            state = autosaved
+        if state is None:
+            self._game.new_game()
+        else:
+            self._game.restore_game(state)
+        self._restoring = True
+        try:
+            [self.beginner_button, self.intermediate_button,
+             self.expert_button, self.custom_button,
+             self.master_button][self._game.level].set_active(True)
+        finally:
+            self._restoring = False
 
     def _do_load_python_cb(self, button):
         ''' Load Python code from the Journal. '''
@@ -174,8 +233,46 @@ class TurtlePondActivity(activity.Activity):
                 self._load_python_code_from_journal)
         if self._game.strategies[CUSTOM] is not None:
             self.custom_button.set_active(True)
-        self._game.level = CUSTOM
-        self._game.new_game()
+            self._game.level = CUSTOM
+            self._game.new_game()
+
+    def _profile_cb(self, button):
+        ''' Start timing the strategy's moves, or stop and show how
+        long they took '''
+        if not self._game.get_profiling():
+            self._game.set_profiling(True)
+            self.status.set_label(_('Timing the turtle\'s moves…'))
+            return
+        self._game.set_profiling(False)
+        profile = self._game.get_profile()
+        if profile is None:
+            self.status.set_label(_('No moves were timed.'))
+        else:
+            self.status.set_label(profile.summary())
+
+    def _export_profile_cb(self, button):
+        ''' Save the strategy's timings to the Journal as text '''
+        profile = self._game.get_profile()
+        if profile is None:
+            self.status.set_label(_('No moves were timed.'))
+            return
+        report = profile.report()
+        _logger.debug(report)
+        # Only needed when exporting, so import it here
+        from sugar3.datastore import datastore
+        file_path = os.path.join(activity.get_activity_root(), 'instance',
+                                 'profile.txt')
+        with open(file_path, 'w') as fp:
+            fp.write(report)
+        dsobject = datastore.create()
+        try:
+            dsobject.metadata['title'] = _('Turtle strategy timings')
+            dsobject.metadata['mime_type'] = 'text/plain'
+            dsobject.set_file_path(file_path)
+            datastore.write(dsobject, transfer_ownership=True)
+        finally:
+            dsobject.destroy()
+        self.status.set_label(profile.summary())
 
     def _load_python_code_from_journal(self, dsobject):
         """ Read the Python code from the Journal object """
@@ -187,10 +284,13 @@ class TurtlePondActivity(activity.Activity):
             file_handle.close()
         except IOError:
             _logger.debug("couldn't open %s" % dsobject.file_path)
-        self._game.strategies[CUSTOM] = python_code
+        if python_code is not None:
+            self._game.set_custom_strategy(python_code)
 
     def _chooser(self, filter, action):
         ''' Choose an object from the datastore and take some action '''
+        # Only needed when loading from the Journal, so import it here
+        from sugar3.graphics.objectchooser import ObjectChooser
         chooser = None
         try:
             chooser = ObjectChooser(parent=self, what_filter=filter)
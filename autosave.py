@@ -0,0 +1,75 @@
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+autosave.py keeps a copy of the game in progress on disk, so that a
+game survives the activity being killed before the Journal is saved.
+
+The main loop only hands over the state; a thread writes it. If
+several states arrive while a write is under way, only the latest is
+written. Each write goes to a temporary file that then replaces the
+old one, so the file on disk is always whole.
+'''
+
+import os
+import threading
+
+from utils import json_load, json_dump
+
+import logging
+_logger = logging.getLogger('turtle-in-a-pond-activity')
+
+
+class Autosaver():
+    ''' Writes the latest state to a file, in a thread '''
+
+    def __init__(self, path):
+        self._path = path
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def save(self, state):
+        ''' Queue a state (a dict) to be written; never waits '''
+        with self._lock:
+            self._pending = state
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        self._wake.set()
+
+    def load(self):
+        ''' Return the last state saved, or None '''
+        try:
+            with open(self._path, 'r') as fp:
+                state = json_load(fp.read())
+        except (OSError, ValueError) as e:
+            _logger.debug('no autosave: {}'.format(e))
+            return None
+        return state if isinstance(state, dict) else None
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                state, self._pending = self._pending, None
+            if state is None:
+                continue
+            temporary = self._path + '.tmp'
+            try:
+                with open(temporary, 'w') as fp:
+                    fp.write(json_dump(state))
+                os.replace(temporary, self._path)
+            except (OSError, TypeError, ValueError) as e:
+                _logger.debug('cannot autosave: {}'.format(e))
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+batchsim.py plays many games at once with NumPy, e.g.
+
+    python3 batchsim.py --games 20000 --strategy expert --check 50
+
+The boards are rows of arrays (dot states, turtle, orientation,
+weights) and every ply -- the player blocks a dot, the turtle moves,
+the game may end -- is a handful of array operations over all the
+games still being played. The beginner, intermediate and expert
+strategies are the same rules as the strategy source in board.py,
+written with arrays.
+
+The random numbers each game used are kept, so that --check can play
+sampled games again with the scalar Board and strategy source and
+confirm that every move is the same.
+'''
+
+import argparse
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import board as scalar
+from board import Board, Pond, load_strategy, THIRTEEN, START_BLOCKED, \
+    BLOCKED_WEIGHT, NOT_OVER, ESCAPED, TRAPPED, BEGINNER_STRATEGY, \
+    INTERMEDIATE_STRATEGY, EXPERT_STRATEGY
+
+# Dot states
+OPEN = 0
+BLOCKED = 1
+EDGE = 2
+RUNNING = -1
+STRATEGIES = {'beginner': BEGINNER_STRATEGY,
+              'intermediate': INTERMEDIATE_STRATEGY,
+              'expert': EXPERT_STRATEGY}
+PLAYERS = ['random', 'greedy']
+BATCH_SIZE = 4096  # games stepped together
+
+
+class BatchSimulator():
+    ''' Plays games of one strategy against one player, many at a time '''
+
+    def __init__(self, strategy='expert', player='random', pond=None,
+                 seed=None):
+        if np is None:
+            raise ImportError('batchsim.py needs NumPy')
+        if strategy not in STRATEGIES:
+            raise ValueError('unknown strategy {}'.format(strategy))
+        if player not in PLAYERS:
+            raise ValueError('unknown player {}'.format(player))
+        self.strategy = strategy
+        self.player = player
+        self._board = Board(pond)
+        board = self._board
+        self._n = board.number_of_dots()
+        # Row n is the wall: every neighbor of it is the wall too
+        self._neighbors = np.array(
+            list(board._neighborhoods) + [(self._n,) * 6], dtype=np.int32)
+        types = [board._types[dot] for dot in range(self._n)] + [True]
+        self._empty = np.array(
+            [EDGE if t is None else BLOCKED if t else OPEN for t in types],
+            dtype=np.int8)
+        self._water = np.array(board._water, dtype=np.int32)
+        self._start = board._start_dot
+        pond = board.get_pond()
+        self._ray_length = pond.width + pond.height
+        self._start_blocks = int(round(START_BLOCKED * len(board._water) /
+                                       float(THIRTEEN * THIRTEEN)))
+        self._rng = np.random.default_rng(seed)
+
+    def run(self, games, record=False):
+        ''' Play games. Returns (results, moves) arrays, plus the record
+        of each game if asked for. '''
+        results = np.empty(games, dtype=np.int8)
+        moves = np.empty(games, dtype=np.int32)
+        records = []
+        for first in range(0, games, BATCH_SIZE):
+            last = min(first + BATCH_SIZE, games)
+            r, m, rec = self._run_batch(last - first)
+            results[first:last] = r
+            moves[first:last] = m
+            records.append(rec)
+        if record:
+            return results, moves, _join_records(records)
+        return results, moves
+
+    def _run_batch(self, k):
+        rng = self._rng
+        rows = np.arange(k)
+        cells = np.tile(self._empty, (k, 1))
+        turtle = np.full(k, self._start, dtype=np.int32)
+        orientation = np.zeros(k, dtype=np.int32)
+        # Block a few dots to start, as Board.new_game does
+        start = self._water[(rng.random((k, self._start_blocks)) *
+                             len(self._water)).astype(np.int32)]
+        for i in range(self._start_blocks):
+            dots = start[:, i]
+            ok = (cells[rows, dots] == OPEN) & (dots != turtle)
+            cells[rows[ok], dots[ok]] = BLOCKED
+        result = np.full(k, RUNNING, dtype=np.int8)
+        moves = np.zeros(k, dtype=np.int32)
+        record = {'start': start, 'blocks': [], 'draws': [], 'turtles': [],
+                  'orientations': []}
+        live = rows
+        while len(live) > 0:
+            c = cells[live]
+            t = turtle[live]
+            o = orientation[live]
+            # The player blocks a dot
+            blocks = self._choose(c, t)
+            stuck = blocks < 0
+            result[live[stuck]] = NOT_OVER
+            played = ~stuck
+            live, c, t, o, blocks = live[played], c[played], t[played], \
+                o[played], blocks[played]
+            c[np.arange(len(live)), blocks] = BLOCKED
+            # The turtle moves
+            draws = rng.random(len(live))
+            t, o = self._move(c, t, o, draws)
+            cells[live] = c
+            turtle[live] = t
+            orientation[live] = o
+            moves[live] += 1
+            # Keep what happened, by game, for parity checks
+            for name, values in (('blocks', blocks), ('draws', draws),
+                                 ('turtles', t), ('orientations', o)):
+                column = np.full(k, -1, dtype=values.dtype)
+                column[live] = values
+                record[name].append(column)
+            # Is it over?
+            over = self._game_over(c, t)
+            result[live] = np.where(over == NOT_OVER, RUNNING, over)
+            live = live[over == NOT_OVER]
+        return result, moves, record
+
+    def _choose(self, c, t):
+        ''' The dot each player blocks, or -1 if there are none left '''
+        rows = np.arange(len(t))
+        eligible = c[:, :self._n] == OPEN
+        eligible[rows, t] = False
+        scores = np.where(eligible, self._rng.random(eligible.shape), -1.)
+        blocks = np.argmax(scores, axis=1).astype(np.int32)
+        blocks[~eligible.any(axis=1)] = -1
+        if self.player == 'greedy':
+            # The turtle's neighbor closest to an edge, if one is open
+            dots, ordered = self._ordered_weights(c, t)
+            open_ = c[rows[:, None], ordered] == OPEN
+            has = open_.any(axis=1)
+            first = ordered[rows, np.argmax(open_, axis=1)]
+            blocks = np.where(has, first, blocks).astype(np.int32)
+        return blocks
+
+    def _move(self, c, t, o, draws):
+        ''' Apply the strategy to every game. Returns the new turtle
+        dots and orientations. '''
+        rows = np.arange(len(t))
+        dots = self._neighbors[t]  # (games, 6)
+        types = c[rows[:, None], dots]
+        n = (draws * 6).astype(np.int32)  # int(uniform(0, 6))
+        if self.strategy == 'beginner':
+            return self._random_step(types, dots, t, o, n, True)
+        # Head for an edge next to the turtle
+        edge = types == EDGE
+        at_edge = edge.any(axis=1)
+        edge_direction = np.argmax(edge, axis=1)
+        new_t, new_o = self._random_step(
+            types, dots, t, o, n, self.strategy == 'expert')
+        if self.strategy == 'intermediate':
+            ahead = self._daylight_ahead(c, t, o)
+            new_t = np.where(ahead, dots[rows, o], new_t)
+            new_o = np.where(ahead, o, new_o)
+        else:
+            # The first neighbor, nearest the edge first, with a
+            # straight run to the edge
+            _, ordered = self._ordered_weights(c, t, directions=True)
+            daylight = np.stack([self._daylight_ahead(
+                c, t, np.full(len(t), i, dtype=np.int32))
+                for i in range(6)], axis=1)
+            in_order = daylight[rows[:, None], ordered]
+            found = in_order.any(axis=1)
+            direction = ordered[rows, np.argmax(in_order, axis=1)]
+            new_t = np.where(found, dots[rows, direction], new_t)
+            new_o = np.where(found, direction, new_o)
+        new_t = np.where(at_edge, dots[rows, edge_direction], new_t)
+        new_o = np.where(at_edge, edge_direction, new_o)
+        return new_t.astype(np.int32), new_o.astype(np.int32)
+
+    def _random_step(self, types, dots, t, o, n, turn_when_stuck):
+        ''' Step to the first free neighbor, starting from a random
+        direction. A turtle with nowhere to go stays put, and the
+        beginner and expert turtles still turn. '''
+        rows = np.arange(len(t))
+        directions = (np.arange(6)[None, :] + n[:, None]) % 6
+        free = types[rows[:, None], directions] != BLOCKED
+        any_free = free.any(axis=1)
+        direction = directions[rows, np.argmax(free, axis=1)]
+        new_t = np.where(any_free, dots[rows, direction], t)
+        if turn_when_stuck:
+            new_o = np.where(any_free, direction, (5 + n) % 6)
+        else:
+            new_o = np.where(any_free, direction, o)
+        return new_t, new_o
+
+    def _daylight_ahead(self, c, t, o):
+        ''' Is there a straight run of open dots from each turtle to the
+        edge, in the direction it is facing? '''
+        rows = np.arange(len(t))
+        neighbors = self._neighbors
+        dot = neighbors[t, o]
+        for step in range(self._ray_length):
+            going = c[rows, dot] == OPEN
+            if not going.any():
+                break
+            dot = np.where(going, neighbors[dot, o], dot)
+        return c[rows, dot] == EDGE
+
+    def _ordered_weights(self, c, t, directions=False):
+        ''' The turtle's neighbors sorted by distance to the edge, as
+        dots or as directions. Ties keep their order, as sorted() does. '''
+        weights = self._weights(c)
+        rows = np.arange(len(t))
+        dots = self._neighbors[t]
+        order = np.argsort(weights[rows[:, None], dots], axis=1,
+                           kind='stable')
+        if directions:
+            return weights, order
+        return dots, dots[rows[:, None], order]
+
+    def _weights(self, c):
+        ''' Steps from each dot to the edge, a ring at a time for all
+        games at once; BLOCKED_WEIGHT if there is no way out '''
+        weights = np.full(c.shape, BLOCKED_WEIGHT, dtype=np.int32)
+        reached = c == EDGE
+        weights[reached] = 0
+        open_ = c == OPEN
+        frontier = reached
+        distance = 0
+        while frontier.any():
+            distance += 1
+            new = frontier[:, self._neighbors].any(axis=2) & open_ & ~reached
+            weights[new] = distance
+            reached |= new
+            frontier = new
+        return weights
+
+    def _game_over(self, c, t):
+        rows = np.arange(len(t))
+        escaped = c[rows, t] == EDGE
+        around = c[rows[:, None], self._neighbors[t]]
+        trapped = (around == BLOCKED).all(axis=1)
+        return np.where(escaped, ESCAPED,
+                        np.where(trapped, TRAPPED, NOT_OVER)).astype(np.int8)
+
+
+def _join_records(records):
+    ''' Put the records of several batches end to end '''
+    joined = {'start': np.concatenate([r['start'] for r in records])}
+    for name in ('blocks', 'draws', 'turtles', 'orientations'):
+        plies = max([len(r[name]) for r in records])
+        columns = []
+        for r in records:
+            games = len(r['start'])
+            padded = r[name] + [np.full(games, -1, dtype=r[name][0].dtype)
+                                ] * (plies - len(r[name]))
+            columns.append(np.stack(padded) if padded else
+                           np.empty((0, games)))
+        joined[name] = np.concatenate(columns, axis=1)
+    return joined
+
+
+def parity_check(simulator, results, moves, record, samples, seed=0):
+    ''' Replay sampled games with the scalar Board and strategy source,
+    feeding them the random numbers the batch used. Returns a list of
+    (game, ply, what) for every difference. '''
+    source = STRATEGIES[simulator.strategy]
+    pond = simulator._board.get_pond()
+    games = np.random.default_rng(seed).choice(
+        len(results), size=min(samples, len(results)), replace=False)
+    differences = []
+    uniform = scalar.uniform
+    try:
+        for game in games:
+            board = Board(pond)
+            board.new_game([int(dot) for dot in record['start'][game]])
+            strategy = load_strategy(source)
+            result = NOT_OVER
+            ply = 0
+            while ply < record['blocks'].shape[0]:
+                dot = int(record['blocks'][ply, game])
+                if dot < 0:
+                    break
+                board.block(dot)
+                draw = float(record['draws'][ply, game])
+                scalar.uniform = lambda a, b: a + (b - a) * draw
+                new_dot = board.move_turtle(
+                    strategy(board, board._dot_to_grid(board.get_turtle())))
+                if new_dot != record['turtles'][ply, game] or \
+                   board.get_orientation() != \
+                   record['orientations'][ply, game]:
+                    differences.append((int(game), ply, 'move'))
+                    break
+                ply += 1
+                result = board.test_game_over(new_dot)
+                if result != NOT_OVER:
+                    break
+            if result != results[game] or ply != moves[game]:
+                differences.append((int(game), ply, 'result'))
+    finally:
+        scalar.uniform = uniform
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Play many turtle games at once with NumPy.')
+    parser.add_argument('--games', type=int, default=10000,
+                        help='games to play (default 10000)')
+    parser.add_argument('--strategy', default='expert',
+                        choices=sorted(STRATEGIES))
+    parser.add_argument('--player', default='random', choices=PLAYERS)
+    parser.add_argument('--width', type=int, default=THIRTEEN)
+    parser.add_argument('--height', type=int, default=THIRTEEN)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--check', type=int, default=0, metavar='N',
+                        help='replay N sampled games with the scalar rules')
+    args = parser.parse_args(argv)
+    if np is None:
+        parser.error('NumPy is not installed')
+
+    simulator = BatchSimulator(args.strategy, args.player,
+                               Pond(args.width, args.height), args.seed)
+    start = time.time()
+    results, moves, record = simulator.run(args.games, record=True)
+    elapsed = time.time() - start
+    trapped = results == TRAPPED
+    print('{} vs {}: {} games, win {:.1f}%, escape {:.1f}%, '
+          'capture in {:.1f}'.format(
+              args.strategy, args.player, args.games,
+              100. * trapped.mean(), 100. * (results == ESCAPED).mean(),
+              moves[trapped].mean() if trapped.any() else 0))
+    print('{:.2f} s: {:.0f} boards per second'.format(
+        elapsed, args.games / max(elapsed, 1e-9)))
+    if args.check > 0:
+        differences = parity_check(simulator, results, moves, record,
+                                   args.check)
+        print('parity: {} of {} sampled games differ'.format(
+            len(set([game for game, ply, what in differences])),
+            min(args.check, args.games)))
+        if differences:
+            print(differences[:10])
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
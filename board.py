@@ -0,0 +1,659 @@
+# -*- coding: utf-8 -*-
+#Copyright (c) 2011 Walter Bender (rules moved from game.py)
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+board.py is the Turtle in a Pond rules engine. It knows about the
+cells of the pond, where the turtle is and which way it is facing,
+but nothing about Gtk, Cairo or Sugar, so it can be used to simulate
+games without a display.
+
+Each cell is a Dot whose type is None (an edge), False (open) or
+True (blocked). The size and shape of the pond come from a Pond; rocks
+and dry land are dots that are always blocked. The same state is also
+kept as bitboards, integers in which bit n stands for dot n, so that
+questions about whole neighborhoods or regions are a few bitwise
+operations (see PondBits). Strategies are Python source strings defining
+_turtle_strategy(self, turtle), where self is the Board and turtle
+is the (col, row) of the turtle; they return the (col, row) the
+turtle should move to and set self._orientation.
+'''
+
+import hashlib
+from collections import deque
+from math import atan2
+from functools import lru_cache
+from heapq import heappush, heappop
+from random import uniform
+
+from solver import Solver, SEARCH_TIME
+
+THIRTEEN = 13
+NOT_OVER = 0
+ESCAPED = 1
+TRAPPED = 2
+BLOCKED_WEIGHT = 1000
+START_BLOCKED = 15  # dots blocked at the start of a game on a 13x13 pond
+# Mask characters; anything else is dry land, outside the pond
+WATER = '.'
+ROCK = '#'
+# How dot types are written in a board snapshot
+SNAPSHOT_CODES = {None: 'e', False: 'o', True: 'b'}
+SNAPSHOT_TYPES = {'e': None, 'o': False, 'b': True}
+ERROR_MESSAGES = [(ZeroDivisionError, 'Python zero-divide error: {}'),
+                  (ValueError, 'Python value error: {}'),
+                  (SyntaxError, 'Python syntax error: {}'),
+                  (NameError, 'Python name error: {}'),
+                  (OverflowError, 'Python overflow error: {}'),
+                  (TypeError, 'Python type error: {}')]
+CIRCLE = [[(0, -1), (1, 0), (0, 1), (-1, 1), (-1, 0), (-1, -1)],
+          [(1, -1), (1, 0), (1, 1), (0, 1), (-1, 0), (0, -1)]]
+''' Simple strategy: head to daylight or randomly check for an open dot
+    turtle is the (col, row) of the current turtle position '''
+BEGINNER_STRATEGY = 'def _turtle_strategy(self, turtle):\n\
+    dots = self._surrounding_dots(turtle)\n\
+    n = int(uniform(0, 6))\n\
+    for i in range(6):\n\
+        if not self._dots[dots[(i + n) % 6]].type:\n\
+            self._orientation = (i + n) % 6\n\
+            return self._dot_to_grid(dots[(i + n) % 6])\n\
+    self._orientation = (i + n) % 6\n\
+    return turtle\n'
+INTERMEDIATE_STRATEGY = 'def _turtle_strategy(self, turtle):\n\
+    dots = self._surrounding_dots(turtle)\n\
+    if self._edge_next_to(turtle):\n\
+        for i in range(6):  # search for an edge\n\
+            if self._dots[dots[i]].type is None:\n\
+                self._orientation = i\n\
+                return self._dot_to_grid(dots[i])\n\
+    if self._daylight_ahead(turtle):\n\
+        return self._dot_to_grid(dots[self._orientation])\n\
+    n = int(uniform(0, 6))  # choose a random orientation\n\
+    for i in range(6):  # search for an opening\n\
+        if not self._dots[dots[(i + n) % 6]].type:\n\
+            self._orientation = (i + n) % 6\n\
+            return self._dot_to_grid(dots[(i + n) % 6])\n\
+    return turtle\n'
+EXPERT_STRATEGY = 'def _turtle_strategy(self, turtle):\n\
+    dots = self._surrounding_dots(turtle)\n\
+    if self._edge_next_to(turtle):\n\
+        for i in range(6):\n\
+            if self._dots[dots[i]].type is None:\n\
+                self._orientation = i\n\
+                return self._dot_to_grid(dots[i])\n\
+    dots_ordered_by_weight = self._ordered_weights(turtle)\n\
+    for i in range(6):\n\
+        self._orientation = dots.index(dots_ordered_by_weight[i])\n\
+        if self._daylight_ahead(turtle):\n\
+            return self._dot_to_grid(dots[self._orientation])\n\
+    n = int(uniform(0, 6))\n\
+    for i in range(6):\n\
+        if not self._dots[dots[(i + n) % 6]].type:\n\
+            self._orientation = (i + n) % 6\n\
+            return self._dot_to_grid(dots[(i + n) % 6])\n\
+    self._orientation = (i + n) % 6\n\
+    return turtle\n'
+''' Search the game tree for the best move '''
+MASTER_STRATEGY = 'def _turtle_strategy(self, turtle):\n\
+    return self._best_move(turtle)\n'
+
+
+class Pond():
+    ''' The size and shape of a pond. mask is an optional list of
+    height strings of width characters, one per row: WATER, a ROCK
+    that is always blocked, or anything else for dry land. Water next
+    to dry land or to the side of the grid is the edge of the pond. '''
+
+    def __init__(self, width=THIRTEEN, height=THIRTEEN, mask=None):
+        if width < 3 or height < 3:
+            raise ValueError('the pond is too small')
+        if mask is not None:
+            mask = tuple(mask)
+            if len(mask) != height or \
+               [row for row in mask if len(row) != width]:
+                raise ValueError('mask does not fit the pond')
+        self.width = width
+        self.height = height
+        self.mask = mask
+
+    def _key(self):
+        return (self.width, self.height, self.mask)
+
+    def __eq__(self, other):
+        return isinstance(other, Pond) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def describe(self):
+        ''' Return the pond as a dictionary that can be saved as JSON '''
+        return {'width': self.width, 'height': self.height,
+                'mask': None if self.mask is None else list(self.mask)}
+
+    @classmethod
+    def from_description(cls, description):
+        ''' Make a pond from describe() '''
+        return cls(description['width'], description['height'],
+                   description.get('mask'))
+
+
+def count_bits(bits):
+    ''' How many dots are in a bitboard? '''
+    return bin(bits).count('1')
+
+
+def dots_of(bits):
+    ''' Return the dots in a bitboard, lowest first '''
+    dots = []
+    while bits:
+        low = bits & -bits
+        dots.append(low.bit_length() - 1)
+        bits ^= low
+    return dots
+
+
+class PondBits():
+    ''' The fixed bitboards of a pond: every dot, the water, the edge,
+    the dots that are always blocked, and the six neighbors of each
+    dot. grow() and reachable() flood a region a ring at a time, for
+    all of its dots at once. '''
+
+    def __init__(self, width, height, types, neighborhoods, in_pond):
+        wall = width * height
+        self.width = width
+        self.everything = (1 << wall) - 1
+        self.water = 0
+        self.edge = 0
+        self.fixed = 0
+        for dot in range(wall):
+            if in_pond[dot]:
+                self.water |= 1 << dot
+            if types[dot] is None:
+                self.edge |= 1 << dot
+            elif types[dot] is True:
+                self.fixed |= 1 << dot
+        self.neighbors = []
+        for dot in range(wall):
+            bits = 0
+            for neighbor in neighborhoods[dot]:
+                if neighbor != wall:
+                    bits |= 1 << neighbor
+            self.neighbors.append(bits)
+        first_column = 0
+        last_column = 0
+        even_rows = 0
+        for row in range(height):
+            first_column |= 1 << (row * width)
+            last_column |= 1 << (row * width + width - 1)
+            if row % 2 == 0:
+                even_rows |= ((1 << width) - 1) << (row * width)
+        self._not_first_column = self.everything & ~first_column
+        self._not_last_column = self.everything & ~last_column
+        self._even_rows = even_rows
+        self._odd_rows = self.everything & ~even_rows
+
+    def grow(self, bits):
+        ''' Add the neighbors on the grid (dry land included) of every
+        dot in bits. Even rows touch the dots above and below them and
+        one to the left; odd rows one to the right. '''
+        width = self.width
+        everything = self.everything
+        right = (bits << 1) & self._not_first_column
+        left = (bits >> 1) & self._not_last_column
+        return bits | left | right | \
+            (((bits << width) | (bits >> width)) & everything) | \
+            (((right << width) | (right >> width)) & self._even_rows) | \
+            (((left << width) | (left >> width)) & self._odd_rows)
+
+    def reachable(self, bits, passable):
+        ''' Flood out from bits through the passable dots '''
+        while True:
+            grown = self.grow(bits) & (passable | bits)
+            if grown == bits:
+                return bits
+            bits = grown
+
+
+@lru_cache(maxsize=8)
+def _pond_tables(pond):
+    ''' Build the tables for a pond once.
+
+    neighbors[dot * 6 + direction] is the dot next to dot in that
+    direction, or width * height (the wall sentinel) if there is no
+    such dot or it is dry land. neighborhoods[dot] is the same six
+    dots as a tuple. next_edge[dot] is the next edge dot going
+    clockwise around the pond, or the wall sentinel if dot is not on
+    the edge. types[dot] is the type of the dot on an empty pond and
+    water lists the dots in the pond and in_pond[dot] says whether a
+    dot is one of them. start is the turtle's dot and bits the
+    pond's PondBits. '''
+    width, height, mask = pond.width, pond.height, pond.mask
+    wall = width * height
+    if mask is None:
+        cells = WATER * wall
+    else:
+        cells = ''.join(mask)
+    water = tuple(dot for dot in range(wall) if cells[dot] in (WATER, ROCK))
+    in_pond = tuple(cells[dot] in (WATER, ROCK) for dot in range(wall))
+    neighbors = []
+    for dot in range(wall):
+        col, row = dot % width, dot // width
+        for dx, dy in CIRCLE[row % 2]:
+            neighbor = col + dx + (row + dy) * width
+            if 0 <= col + dx < width and 0 <= row + dy < height and \
+               in_pond[neighbor]:
+                neighbors.append(neighbor)
+            else:
+                neighbors.append(wall)
+    neighbors = tuple(neighbors)
+    neighborhoods = tuple(neighbors[dot * 6:dot * 6 + 6]
+                          for dot in range(wall))
+    types = [True] * wall
+    for dot in water:
+        if cells[dot] == ROCK:
+            continue
+        if wall in neighborhoods[dot]:
+            types[dot] = None  # edge
+        else:
+            types[dot] = False
+    edges = [dot for dot in water if types[dot] is None]
+    next_edge = [wall] * wall
+    if mask is None:
+        for col in range(width - 1):  # left to right along the top
+            next_edge[col] = col + 1
+        for row in range(height - 1):  # down the right side
+            next_edge[width - 1 + row * width] = \
+                width - 1 + (row + 1) * width
+        for col in range(width - 1, 0, -1):  # right to left along the bottom
+            next_edge[col + (height - 1) * width] = \
+                col - 1 + (height - 1) * width
+        for row in range(height - 1, 0, -1):  # up the left side
+            next_edge[row * width] = (row - 1) * width
+    elif edges:
+        # Go round the middle of the pond, clockwise on the screen
+        cx = sum([dot % width for dot in water]) / float(len(water))
+        cy = sum([dot // width for dot in water]) / float(len(water))
+        ring = sorted(edges, key=lambda dot: atan2(dot // width - cy,
+                                                   dot % width - cx))
+        for i, dot in enumerate(ring):
+            next_edge[dot] = ring[(i + 1) % len(ring)]
+    # The turtle starts on the open dot nearest the middle
+    middle = (width // 2, height // 2)
+    start = min([dot for dot in water if types[dot] is False] or [0],
+                key=lambda dot: ((dot % width - middle[0]) ** 2 +
+                                 (dot // width - middle[1]) ** 2, dot))
+    bits = PondBits(width, height, types, neighborhoods, in_pond)
+    return neighbors, neighborhoods, tuple(next_edge), tuple(types), \
+        water, in_pond, start, bits
+
+
+_strategies = {}
+
+
+def strategy_hash(source):
+    ''' Return the key used to cache compiled strategy source '''
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def load_strategy(source):
+    ''' Compile strategy source (once) and return its _turtle_strategy.
+    Raises SyntaxError, NameError, etc. if the source is broken. '''
+    key = strategy_hash(source)
+    if key not in _strategies:
+        userdefined = {}
+        exec(compile(source, '<strategy>', 'exec'), globals(), userdefined)
+        if '_turtle_strategy' not in userdefined:
+            raise NameError("name '_turtle_strategy' is not defined")
+        _strategies[key] = userdefined['_turtle_strategy']
+    return _strategies[key]
+
+
+def error_message(e):
+    ''' Describe an exception raised by strategy code '''
+    for error, message in ERROR_MESSAGES:
+        if isinstance(e, error):
+            return message.format(e)
+    return 'Python error'
+
+
+def forget_strategy(source):
+    ''' Drop compiled strategy source from the cache '''
+    if source is not None:
+        _strategies.pop(strategy_hash(source), None)
+
+
+class Dot():
+    ''' A cell in the pond '''
+
+    __slots__ = ('type',)
+
+    def __init__(self, type=False):
+        self.type = type
+
+
+class Board():
+    ''' The cells of the pond, the turtle and the rules of the game '''
+
+    def __init__(self, pond=None):
+        if pond is None:
+            pond = Pond()
+        self._pond = pond
+        self._width = pond.width
+        self._neighbors, self._neighborhoods, self._next_edge, \
+            self._types, self._water, self._in_pond, self._start_dot, \
+            self._bits = _pond_tables(pond)
+        self._dots = [Dot(type) for type in self._types]
+        self._number_of_dots = len(self._dots)
+        # Off-pond neighbors point at a wall dot that is always blocked
+        self._dots.append(Dot(True))
+        self._turtle_dot = self._start_dot
+        self._orientation = 0
+        self._weights = []
+        self._blocked = self._bits.fixed  # bitboard of blocked dots
+        self._solver = None  # made the first time it is needed
+        self._search_limits = (SEARCH_TIME, None)
+        self.moves = 0
+
+    def new_game(self, blocked=None):
+        ''' Clear the pond and block a few dots to start. Returns the
+        list of dots that were blocked. '''
+        for dot, type in zip(self._dots, self._types):
+            dot.type = type
+        self._turtle_dot = self._start_dot
+        self._orientation = 0
+        self.moves = 0
+        if blocked is None:
+            water = self._water
+            blocked = []
+            for i in range(int(round(START_BLOCKED * len(water) /
+                                     float(THIRTEEN * THIRTEEN)))):
+                blocked.append(water[int(uniform(0, len(water)))])
+        filled = []
+        for n in blocked:
+            if n != self._turtle_dot and self._dots[n].type is False:
+                self._dots[n].type = True
+                filled.append(n)
+        self._blocked = self._bits.fixed
+        for n in filled:
+            self._blocked |= 1 << n
+        # Calculate the distances to the edge
+        self._initialize_weights()
+        return filled
+
+    def get_pond(self):
+        ''' Return the Pond this board was made for '''
+        return self._pond
+
+    def in_pond(self, dot):
+        ''' Is a dot part of the pond (rather than dry land)? '''
+        return self._in_pond[dot]
+
+    def is_rock(self, dot):
+        ''' Is a dot a rock or dry land, which is always blocked? '''
+        return self._types[dot] is True
+
+    def first_edge(self):
+        ''' Return the edge dot where a trip round the pond starts '''
+        for dot in self._water:
+            if self._types[dot] is None:
+                return dot
+        return None
+
+    def get_turtle(self):
+        ''' Return the dot the turtle is on '''
+        return self._turtle_dot
+
+    def get_orientation(self):
+        ''' Return the direction (0-5) the turtle is facing '''
+        return self._orientation
+
+    def set_orientation(self, orientation):
+        ''' Set the direction (0-5) the turtle is facing '''
+        self._orientation = orientation % 6
+
+    def get_snapshot(self):
+        ''' Return the dots as a string (e: edge, o: open, b: blocked),
+        the turtle dot and its orientation '''
+        cells = ''.join([SNAPSHOT_CODES[dot.type]
+                         for dot in self._dots[:self._number_of_dots]])
+        return cells, self._turtle_dot, self._orientation
+
+    def set_snapshot(self, cells, turtle, orientation):
+        ''' Restore the board from get_snapshot() '''
+        if len(cells) != self._number_of_dots:
+            raise ValueError('snapshot does not fit the pond')
+        for dot, code, type in zip(self._dots, cells, self._types):
+            dot.type = SNAPSHOT_TYPES[code] if type is False else type
+        self._blocked = 0
+        for dot in range(self._number_of_dots):
+            if self._dots[dot].type is True:
+                self._blocked |= 1 << dot
+        self._turtle_dot = turtle
+        self._orientation = orientation % 6
+        self._initialize_weights()
+
+    def get_blocked(self):
+        ''' Return the dots blocked in this game, rocks left out '''
+        return dots_of(self._blocked & ~self._bits.fixed)
+
+    def set_position(self, blocked, turtle, orientation):
+        ''' Restore the board from get_blocked(), the turtle dot and
+        its orientation '''
+        blocked = set(blocked)
+        self.set_snapshot(''.join(['b' if dot in blocked else 'o'
+                                   for dot in range(self._number_of_dots)]),
+                          turtle, orientation)
+
+    def get_type(self, dot):
+        ''' Return the type of a dot: None, False or True '''
+        return self._dots[dot].type
+
+    def number_of_dots(self):
+        ''' How many dots are in the pond? '''
+        return self._number_of_dots
+
+    def next_edge(self, dot):
+        ''' Return the next edge dot going clockwise around the pond '''
+        return self._next_edge[dot]
+
+    def block(self, dot):
+        ''' Block an open dot. Returns False if it cannot be blocked. '''
+        if self._dots[dot].type is not False or dot == self._turtle_dot:
+            return False
+        self._dots[dot].type = True
+        self._blocked |= 1 << dot
+        self._repair_weights(dot)
+        return True
+
+    def move_turtle(self, pos):
+        ''' Move the turtle to the (col, row) returned by a strategy '''
+        new_dot = self._grid_to_dot(pos)
+        if new_dot != self._turtle_dot and \
+           (new_dot not in self._neighborhoods[self._turtle_dot] or
+            self._dots[new_dot].type):
+            raise ValueError('turtle cannot move to {}'.format(pos))
+        self._turtle_dot = new_dot
+        self.moves += 1
+        return new_dot
+
+    def test_game_over(self, new_dot):
+        ''' Has the turtle escaped or been trapped? '''
+        bit = 1 << new_dot
+        if bit & self._bits.edge:
+            return ESCAPED
+        if self._bits.neighbors[new_dot] & ~self._blocked:
+            return NOT_OVER
+        return TRAPPED
+
+    def set_search_limits(self, time_limit=SEARCH_TIME, node_limit=None):
+        ''' How long the solver may think about each move, in seconds
+        and/or positions searched (None for no limit) '''
+        self._search_limits = (time_limit, node_limit)
+        if self._solver is not None:
+            self._solver.time_limit, self._solver.node_limit = \
+                self._search_limits
+
+    def get_solver(self):
+        ''' Return the Solver for this board '''
+        if self._solver is None:
+            self._solver = Solver(self, *self._search_limits)
+        return self._solver
+
+    def _best_move(self, pos):
+        ''' Returns the (col, row) the solver would move the turtle at
+        pos to, and faces the turtle that way '''
+        dot = self.get_solver().best_move()
+        if dot is None:
+            return pos  # trapped
+        self._orientation = self._neighborhoods[
+            pos[0] + pos[1] * self._width].index(dot)
+        return self._dot_to_grid(dot)
+
+    def _best_block(self):
+        ''' Returns the dot the solver would block '''
+        return self.get_solver().best_block()
+
+    def blocked_bits(self):
+        ''' Return a bitboard of the blocked dots (rocks included) '''
+        return self._blocked
+
+    def open_bits(self):
+        ''' Return a bitboard of the open dots, not counting the edge '''
+        return self._bits.water & ~self._blocked & ~self._bits.edge
+
+    def edge_bits(self):
+        ''' Return a bitboard of the edge dots '''
+        return self._bits.edge
+
+    def neighbor_bits(self, dot):
+        ''' Return a bitboard of the dots next to a dot '''
+        return self._bits.neighbors[dot]
+
+    def reachable_bits(self, dot):
+        ''' Return a bitboard of the dots the turtle could walk to from
+        a dot, edge dots included '''
+        return self._bits.reachable(
+            1 << dot, self._bits.water & ~self._blocked)
+
+    def _edge_next_to(self, pos):
+        ''' Is there an edge dot next to a position in the grid? '''
+        return self._bits.neighbors[self._grid_to_dot(pos)] & \
+            self._bits.edge != 0
+
+    def _grid_to_dot(self, pos):
+        ''' calculate the dot index from a column and row in the grid '''
+        return pos[0] + pos[1] * self._width
+
+    def _dot_to_grid(self, dot):
+        ''' calculate the grid column and row for a dot '''
+        return [dot % self._width, int(dot / self._width)]
+
+    def _ordered_weights(self, pos):
+        ''' Returns the list of surrounding points sorted by their
+        distance to the edge '''
+        return sorted(self._neighborhoods[pos[0] + pos[1] * self._width],
+                      key=self._weights.__getitem__)
+
+    def _daylight_ahead(self, pos):
+        ''' Returns true if there is a straight path to the edge from
+        the current position/orientation '''
+        neighbors = self._neighbors
+        dots = self._dots
+        orientation = self._orientation
+        dot = neighbors[self._grid_to_dot(pos) * 6 + orientation]
+        while dots[dot].type is False:  # keep looking
+            dot = neighbors[dot * 6 + orientation]
+        return dots[dot].type is None
+
+    def _surrounding_dots(self, pos):
+        ''' Returns a list of the dots surrounding a position in the
+        grid. Strategies may change the list; the board's own code
+        reads the shared table in _neighborhoods instead. '''
+        return list(self._neighborhoods[pos[0] + pos[1] * self._width])
+
+    def _escape_distance(self, pos):
+        ''' How many steps from a position in the grid to the nearest
+        edge, going round blocked dots? '''
+        return self._weights[self._grid_to_dot(pos)]
+
+    def _initialize_weights(self):
+        ''' How many steps to an edge? A breadth-first search out from
+        every edge dot over the open dots; blocked dots, and open dots
+        that cannot reach an edge, get BLOCKED_WEIGHT. '''
+        dots = self._dots
+        neighborhoods = self._neighborhoods
+        weights = [BLOCKED_WEIGHT] * len(dots)
+        queue = deque()
+        for dot in range(self._number_of_dots):
+            if dots[dot].type is None:
+                weights[dot] = 0
+                queue.append(dot)
+        while queue:
+            dot = queue.popleft()
+            weight = weights[dot] + 1
+            for neighbor in neighborhoods[dot]:
+                if weights[neighbor] == BLOCKED_WEIGHT and \
+                   dots[neighbor].type is False:
+                    weights[neighbor] = weight
+                    queue.append(neighbor)
+        self._weights = weights
+
+    def _repair_weights(self, blocked):
+        ''' Update the weights after a dot is blocked, touching only
+        the dots whose shortest path to the edge went through it. '''
+        dots = self._dots
+        neighborhoods = self._neighborhoods
+        weights = self._weights
+        old_weight = weights[blocked]
+        weights[blocked] = BLOCKED_WEIGHT
+        if old_weight == BLOCKED_WEIGHT:
+            return
+        # Walk outwards a level at a time, collecting the dots that have
+        # lost every neighbor one step closer to the edge.
+        orphans = set([blocked])
+        queue = deque([(blocked, old_weight)])
+        while queue:
+            dot, weight = queue.popleft()
+            for neighbor in neighborhoods[dot]:
+                if weights[neighbor] != weight + 1 or neighbor in orphans \
+                   or dots[neighbor].type is not False:
+                    continue
+                for parent in neighborhoods[neighbor]:
+                    if weights[parent] == weight and \
+                       parent not in orphans and not dots[parent].type:
+                        break
+                else:
+                    orphans.add(neighbor)
+                    queue.append((neighbor, weight + 1))
+        orphans.discard(blocked)
+        if not orphans:
+            return
+        # Reconnect the orphans from the dots around them that kept
+        # their weights.
+        for dot in orphans:
+            weights[dot] = BLOCKED_WEIGHT
+        heap = []
+        for dot in orphans:
+            for neighbor in neighborhoods[dot]:
+                if neighbor not in orphans and not dots[neighbor].type and \
+                   weights[neighbor] + 1 < weights[dot]:
+                    weights[dot] = weights[neighbor] + 1
+            if weights[dot] < BLOCKED_WEIGHT:
+                heappush(heap, (weights[dot], dot))
+        while heap:
+            weight, dot = heappop(heap)
+            if weight > weights[dot]:
+                continue
+            for neighbor in neighborhoods[dot]:
+                if neighbor in orphans and weight + 1 < weights[neighbor]:
+                    weights[neighbor] = weight + 1
+                    heappush(heap, (weight + 1, neighbor))
@@ -16,10 +16,11 @@ from gi.repository import Gtk, Gdk, GdkPixbuf, GLib
 
 import cairo
 import os
+import threading
 import time
 
+from collections import OrderedDict
 from math import sqrt, pi
-from random import uniform
 
 from sugar3.activity.activity import get_activity_root
 
@@ -36,62 +37,39 @@ except ImportError:
     GRID_CELL_SIZE = 0
 
 from sprites import Sprites, Sprite
+from rastercache import RasterCache
+from autosave import Autosaver
+from movelog import MoveLogWriter
+from profiler import StrategyProfile, profile_call
+from stats import StatsStore
+import perf
+from perf import mark
+from strategyworker import StrategyWorker, StrategyError
+from board import Board, Pond, load_strategy, error_message, strategy_hash, \
+    THIRTEEN, \
+    NOT_OVER, ESCAPED, TRAPPED, BEGINNER_STRATEGY, INTERMEDIATE_STRATEGY, \
+    EXPERT_STRATEGY, MASTER_STRATEGY
 
 FILL = 1
 STROKE = 0
-THIRTEEN = 13
+CUSTOM = 3
 DOT_SIZE = 20
 DOT_SIZE_GAMEOVER = 70
-CIRCLE = [[(0, -1), (1, 0), (0, 1), (-1, 1), (-1, 0), (-1, -1)],
-          [(1, -1), (1, 0), (1, 1), (0, 1), (-1, 0), (0, -1)]]
-''' Simple strategy: head to daylight or randomly check for an open dot
-    turtle is the (col, row) of the current turtle position '''
-BEGINNER_STRATEGY = 'def _turtle_strategy(self, turtle):\n\
-    dots = self._surrounding_dots(turtle)\n\
-    n = int(uniform(0, 6))\n\
-    for i in range(6):\n\
-        if not self._dots[dots[(i + n) % 6]].type:\n\
-            self._orientation = (i + n) % 6\n\
-            return self._dot_to_grid(dots[(i + n) % 6])\n\
-    self._orientation = (i + n) % 6\n\
-    return turtle\n'
-INTERMEDIATE_STRATEGY = 'def _turtle_strategy(self, turtle):\n\
-    dots = self._surrounding_dots(turtle)\n\
-    for i in range(6):  # search for an edge\n\
-        if self._dots[dots[i]].type is None:\n\
-            self._orientation = i\n\
-            return self._dot_to_grid(dots[i])\n\
-    if self._daylight_ahead(turtle):\n\
-        return self._dot_to_grid(dots[self._orientation])\n\
-    n = int(uniform(0, 6))  # choose a random orientation\n\
-    for i in range(6):  # search for an opening\n\
-        if not self._dots[dots[(i + n) % 6]].type:\n\
-            self._orientation = (i + n) % 6\n\
-            return self._dot_to_grid(dots[(i + n) % 6])\n\
-    return turtle\n'
-EXPERT_STRATEGY = 'def _turtle_strategy(self, turtle):\n\
-    dots = self._surrounding_dots(turtle)\n\
-    for i in range(6):\n\
-        if self._dots[dots[i]].type is None:\n\
-            self._orientation = i\n\
-            return self._dot_to_grid(dots[i])\n\
-    dots_ordered_by_weight = self._ordered_weights(turtle)\n\
-    for i in range(6):\n\
-        self._orientation = dots.index(dots_ordered_by_weight[i])\n\
-        if self._daylight_ahead(turtle):\n\
-            return self._dot_to_grid(dots[self._orientation])\n\
-    n = int(uniform(0, 6))\n\
-    for i in range(6):\n\
-        if not self._dots[dots[(i + n) % 6]].type:\n\
-            self._orientation = (i + n) % 6\n\
-            return self._dot_to_grid(dots[(i + n) % 6])\n\
-    self._orientation = (i + n) % 6\n\
-    return turtle\n'
+DOT_CACHE_SIZE = 16
+EDGE_COLOR = '#B0B0B0'
+ROCK_COLOR = '#606060'
+DOT_LAYER = 100
+TURTLE_LAYER = 200
+THINKING_DELAY = 150  # ms before a slow move is shown as thinking
+OVERLAY_RECT = (0, 0, 300, 44)
+OVERLAY_INTERVAL = 500  # ms between overlay updates
+SAVE_VERSION = 1
 
 
 class Game():
 
-    def __init__(self, canvas, parent=None, colors=['#A0FFA0', '#FF8080']):
+    def __init__(self, canvas, parent=None, colors=['#A0FFA0', '#FF8080'],
+                 pond=None):
         self._activity = parent
         self._colors = colors
 
@@ -101,67 +79,134 @@ class Game():
         self._canvas.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
         self._canvas.connect("draw", self.__draw_cb)
         self._canvas.connect("button-press-event", self._button_press_cb)
+        # Ctrl+Shift+D turns the performance counters on and off
+        parent.connect('key-press-event', self._key_press_cb)
+        self._overlay_id = None
 
         self._width = Gdk.Screen.width()
         self._height = Gdk.Screen.height() - (GRID_CELL_SIZE * 1.5)
-        self._scale = self._height / (14.0 * DOT_SIZE * 1.2)
-        self._scale_gameover = self._height / (4.0 * DOT_SIZE_GAMEOVER * 1.2)
+        if pond is None:
+            pond = Pond()
+        self._pond = pond
+        # The pond fills the screen; the game-over screen is laid out
+        # as if for a 13x13 pond, whatever the size of the pond
+        scale = self._height / ((THIRTEEN + 1) * DOT_SIZE * 1.2)
+        self._scale = min(
+            self._height / ((pond.height + 1) * DOT_SIZE * 1.2),
+            self._width / ((pond.width + 1.5) * DOT_SIZE * 1.2))
         self._dot_size = int(DOT_SIZE * self._scale)
-        self._dot_size_gameover = int(DOT_SIZE_GAMEOVER * self._scale)
+        self._dot_size_gameover = int(DOT_SIZE_GAMEOVER * scale)
+        self._gameover_row = int(DOT_SIZE * scale) + \
+            int(int(DOT_SIZE * scale) / 5.)
         self._turtle_offset = 0
         self._space = int(self._dot_size / 5.)
         self._space_gameover = int(self._dot_size_gameover / 5.)
         self._orientation = 0
+        self._dot_cache = OrderedDict()
+        self._dot_cache_owner = None
+        self._raster_cache = RasterCache(
+            os.path.join(get_activity_root(), 'data', 'raster-cache'))
         self.level = 0
-        self.custom_strategy = None
+        self._worker = None  # started when a custom strategy is loaded
+        self._profiling = False
+        self._profiles = {}  # strategy hash -> StrategyProfile
         self.strategies = [BEGINNER_STRATEGY, INTERMEDIATE_STRATEGY,
-                           EXPERT_STRATEGY, self.custom_strategy]
+                           EXPERT_STRATEGY, None,  # CUSTOM, once loaded
+                           MASTER_STRATEGY]
         self.strategy = self.strategies[self.level]
         self._timeout_id = None
-        self.best_time = self.load_best_time()
+        self._dance_id = None
+        # Every game's outcome, by level and strategy
+        self._stats = StatsStore(
+            os.path.join(get_activity_root(), 'data', 'stats.log'))
+        self.gameover_flag = False
+        self.game_lost = False
+        # The rules live in the board; the sprites are just a view of it
+        self._board = Board(pond)
+        # Moves are worked out in a thread, on a copy of the board
+        # that follows the real one a click at a time
+        self._thinking_board = Board(pond)
+        self._thinking = False
+        self._thinking_id = None
+        self._move_serial = 0
+        self._thinking_serial = None
+        self._clicked = None
+        # Every game played is kept in an append-only log
+        self._move_log = MoveLogWriter(
+            os.path.join(get_activity_root(), 'data', 'moves.log'))
+        # ...and the game in progress is saved after every move
+        self._autosaver = Autosaver(
+            os.path.join(get_activity_root(), 'data', 'autosave.json'))
         # Generate the sprites we'll need...
         self._sprites = Sprites(self._canvas)
+        self._sprites.enable_spatial_index(self._dot_size + self._space)
+        # The pond changes a dot at a time: keep it in a retained layer
+        self._sprites.set_static_layers(DOT_LAYER)
+        self._set_counting(perf.counting_level())
         self._dots = []
+        self._pond_dots = []  # the dots that are not dry land
+        self._dot_index = {}
         self._gameover = []
         self._your_time = []
         self._best_time = []
         self._win_lose = []
-        for y in range(THIRTEEN):
-            for x in range(THIRTEEN):
-                offset_x = int((self._width - THIRTEEN * (self._dot_size + \
-                                      self._space) - self._space) / 2.)
-                if y % 2 == 1:
-                    offset_x += int((self._dot_size + self._space) / 2.)
-                if x == 0 or y == 0 or x == THIRTEEN - 1 or y == THIRTEEN - 1:
-                    self._dots.append(
-                        Sprite(self._sprites,
-                               offset_x + x * (self._dot_size + self._space),
-                               y * (self._dot_size + self._space),
-                               self._new_dot('#B0B0B0', self._dot_size)))
-                else:
-                    self._dots.append(
-                        Sprite(self._sprites,
-                               offset_x + x * (self._dot_size + self._space),
-                               y * (self._dot_size + self._space),
-                               self._new_dot(self._colors[FILL],
-                                             self._dot_size)))
-                    self._dots[-1].type = False  # not set
+        for i in range(self._board.number_of_dots()):
+            if self._board.get_type(i) is None:
+                color = EDGE_COLOR
+            elif self._board.is_rock(i):
+                color = ROCK_COLOR
+            else:
+                color = self._colors[FILL]
+            x, y = self._dot_to_xy(i)
+            dot = Sprite(self._sprites, x, y,
+                         self._new_dot(color, self._dot_size))
+            self._dots.append(dot)
+            if self._board.in_pond(i):
+                self._dot_index[dot] = i
+                self._pond_dots.append(dot)
+            else:
+                dot.hide()
 
         # Put a turtle at the center of the screen...
+        # (its images are rendered after the board has been painted)
         self._turtle_images = []
-        self._rotate_turtle(self._new_turtle())
         self._turtle = Sprite(self._sprites, 0, 0,
-                              self._turtle_images[0])
-        self._move_turtle(self._dots[int(THIRTEEN * THIRTEEN / 2)].get_xy())
+                              cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1))
+        self._move_turtle(self._board.get_turtle())
 
         # ...and initialize.
         self._all_clear()
+        GLib.idle_add(self._finish_startup)
+
+    def _finish_startup(self):
+        ''' Build what the first frame did not need '''
+        self._make_turtle_images()
+        self._move_turtle(self._turtle_dot)
+        self._set_turtle_shape()
+        mark('assets')
+        return False
 
-    def _move_turtle(self, pos):
-        ''' Move turtle and add its offset '''
-        self._turtle.move(pos)
-        self._turtle.move_relative(
-            (-self._turtle_offset, -self._turtle_offset))
+    def _dot_to_xy(self, dot):
+        ''' calculate the screen position of a dot '''
+        x, y = self._board._dot_to_grid(dot)
+        offset_x = int((self._width - self._pond.width * (self._dot_size +
+                                                  self._space) -
+                        self._space) / 2.)
+        if y % 2 == 1:
+            offset_x += int((self._dot_size + self._space) / 2.)
+        return (offset_x + x * (self._dot_size + self._space),
+                y * (self._dot_size + self._space))
+
+    def _move_turtle(self, dot):
+        ''' Move turtle to a dot, allowing for its offset '''
+        self._turtle_dot = dot
+        x, y = self._dot_to_xy(dot)
+        self._turtle.move((x - self._turtle_offset, y - self._turtle_offset))
+
+    def _set_turtle_shape(self):
+        ''' Show the turtle facing its orientation '''
+        if len(self._turtle_images) > 0:
+            self._turtle.set_shape(self._turtle_images[self._orientation])
 
     def _all_clear(self):
         ''' Things to reinitialize when starting up a new game. '''
@@ -174,39 +219,184 @@ class Game():
             your_time_shape.hide()
         for highscore_shape in self._best_time:
             highscore_shape.hide()
-        for dot in self._dots:
-            if dot.type:
-                dot.type = False
+        for i, dot in enumerate(self._dots):
+            if self._board.get_type(i) and not self._board.is_rock(i):
                 dot.set_shape(self._new_dot(self._colors[FILL],
                                             self._dot_size))
             dot.set_label('')
-            dot.set_layer(100)
-        self._turtle.set_layer(100)
-        # Recenter the turtle
-        self._move_turtle(self._dots[int(THIRTEEN * THIRTEEN / 2)].get_xy())
-        self._turtle.set_shape(self._turtle_images[0])
+        self._sprites.set_layers(self._pond_dots, DOT_LAYER)
+        self._turtle.set_layer(TURTLE_LAYER)
+        self._orientation = 0
+        self._set_turtle_shape()
         self._set_label('')
         if self._timeout_id is not None:
             GLib.source_remove(self._timeout_id)
             self._timeout_id = None
+        if self._dance_id is not None:
+            GLib.source_remove(self._dance_id)
+            self._dance_id = None
 
-    def new_game(self, saved_state=None):
+    def new_game(self):
         ''' Start a new game. '''
+        self._start_game(None)
+
+    def restore_game(self, saved_state):
+        ''' Carry on with a game from get_state(). Returns False if it
+        could not be restored and a new game was started instead. '''
+        return self._start_game(saved_state)
+
+    def _new_game_timeout(self):
+        self._timeout_id = None
+        self.new_game()
+        return False
+
+    def _start_game(self, saved_state):
         self.gameover_flag = False
         self.game_lost = False
+        self._move_serial += 1  # drop any move still being worked out
+        self._clicked = None  # ...and forget the click it answers
         self._all_clear()
-        # Fill in a few dots to start
-        for i in range(15):
-            n = int(uniform(0, THIRTEEN * THIRTEEN))
-            if self._dots[n].type is not None:
-                self._dots[n].type = True
-                self._dots[n].set_shape(self._new_dot(self._colors[STROKE],
-                                        self._dot_size))
-        # Calculate the distances to the edge
-        self._initialize_weights()
-        self.game_start_time = time.time()
+        restored = saved_state is not None and \
+            self._restore_board(saved_state)
+        if restored:
+            filled = self._board.get_blocked()
+            elapsed = saved_state['elapsed']
+        else:
+            # Fill in a few dots to start
+            filled = self._board.new_game()
+            elapsed = 0
+        for n in filled:
+            self._dots[n].set_shape(self._new_dot(self._colors[STROKE],
+                                    self._dot_size))
+        self._move_log.start_game(self.level, self._pond, filled,
+                                  self._board.get_turtle(),
+                                  self._board.get_orientation())
+        # Recenter the turtle
+        self._orientation = self._board.get_orientation()
+        self._move_turtle(self._board.get_turtle())
+        self._set_turtle_shape()
+        self.game_start_time = time.time() - elapsed
         self.strategy = self.strategies[self.level]
         self._timeout_id = None
+        self._autosave()
+        return saved_state is None or restored
+
+    def get_state(self):
+        ''' Return the game as a dictionary that can be saved as JSON.
+        A click the turtle has not answered yet is left out. '''
+        blocked = self._board.get_blocked()
+        if self._thinking and self._clicked in blocked:
+            blocked.remove(self._clicked)
+        state = {'version': SAVE_VERSION,
+                 'activity': self._activity.get_id(),
+                 'saved': time.time(),
+                 'over': self.gameover_flag,
+                 'pond': self._pond.describe(),
+                 'blocked': blocked,
+                 'turtle': self._board.get_turtle(),
+                 'orientation': self._board.get_orientation(),
+                 'moves': self._board.moves,
+                 'level': self.level,
+                 'elapsed': round(time.time() - self.game_start_time, 1)}
+        if self.level == CUSTOM and self.strategy is not None:
+            # The hash says which strategy; the source lets it run again
+            state['strategy'] = strategy_hash(self.strategy)
+            state['source'] = self.strategy
+        return state
+
+    def _restore_board(self, state):
+        ''' Put the board back as get_state() left it '''
+        try:
+            if state.get('version') != SAVE_VERSION or state['over'] or \
+               Pond.from_description(state['pond']) != self._pond:
+                return False
+            level = state['level']
+            if level not in range(len(self.strategies)):
+                return False
+            if level == CUSTOM:
+                source = state['source']
+                if strategy_hash(source) != state['strategy']:
+                    return False
+                if source != self.strategies[CUSTOM] and \
+                   not self.set_custom_strategy(source):
+                    return False
+            if not self._board.in_pond(state['turtle']):
+                return False
+            self._board.set_position(state['blocked'], state['turtle'],
+                                     state['orientation'])
+            self._board.moves = state['moves']
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            _logger.debug('cannot restore the game: {}'.format(e))
+            return False
+        self.level = level
+        return True
+
+    def load_autosave(self):
+        ''' Return the state last autosaved, or None '''
+        return self._autosaver.load()
+
+    def _autosave(self):
+        ''' Hand the state to the autosave thread '''
+        self._autosaver.save(self.get_state())
+
+    def set_custom_strategy(self, python_code):
+        ''' Compile a strategy loaded from the Journal in the worker
+        process that will run it. Errors are reported here, once,
+        rather than on every move. '''
+        try:
+            if self._worker is None:
+                self._worker = StrategyWorker()
+            self._worker.load(python_code)
+        except (StrategyError, OSError) as e:
+            self._set_label(str(e))
+            return False
+        self.strategies[CUSTOM] = python_code
+        return True
+
+    def flush_move_log(self):
+        ''' Write out the moves not yet in the log '''
+        self._move_log.flush()
+
+    def set_profiling(self, profiling):
+        ''' Turn the strategy profiler on (starting afresh) or off
+        (keeping what it found) '''
+        if profiling:
+            self._profiles = {}
+        self._profiling = profiling
+
+    def get_profiling(self):
+        return self._profiling
+
+    def get_profile(self):
+        ''' Return the StrategyProfile of the strategy being played,
+        or None if none of its moves were profiled '''
+        return self._profiles.get(self._strategy_key())
+
+    def _add_profile(self, profiles, source, record):
+        ''' Add a profiled move (on the main loop), unless profiling
+        has started afresh since the move began '''
+        if profiles is self._profiles:
+            key = strategy_hash(source)
+            if key not in profiles:
+                profiles[key] = StrategyProfile(source)
+            profiles[key].add(record)
+        return False
+
+    def flush_stats(self):
+        ''' Write out the games not yet in the stats '''
+        self._stats.flush()
+
+    def get_stats(self):
+        ''' Return the LevelStats for the level and strategy being
+        played, or None '''
+        return self._stats.get(self.level, self._strategy_key())
+
+    def _strategy_key(self):
+        ''' The hash of the strategy being played, or None if there is
+        no strategy (a custom level with nothing loaded) '''
+        if self.strategy is None:
+            return None
+        return strategy_hash(self.strategy)
 
     def _set_label(self, string):
         ''' Set the label in the toolbar or the window frame. '''
@@ -220,82 +410,137 @@ class Game():
         if spr == None:
             return
 
-        if spr.type is not None and not spr.type:
-            spr.type = True
+        dot = self._dot_index.get(spr)
+        # Clicks made while the turtle is thinking are dropped
+        if dot is None or self.gameover_flag or self._thinking:
+            return True
+        if self._board.block(dot):
             spr.set_shape(self._new_dot(self._colors[STROKE], self._dot_size))
-            self._weights[self._dots.index(spr)] = 1000
-            self._test_game_over(self._move_the_turtle())
+            self._move_the_turtle(dot)
         return True
 
-    def _find_the_turtle(self):
-        turtle_pos = self._turtle.get_xy()
-        turtle_dot = None
-        for dot in self._dots:
-            pos = dot.get_xy()
-            # Turtle is offset
-            if pos[0] == turtle_pos[0] + self._turtle_offset and \
-               pos[1] == turtle_pos[1] + self._turtle_offset:
-                turtle_dot = self._dots.index(dot)
-                break
-        if turtle_dot is None:
-            _logger.debug('Cannot find the turtle...')
-            return None
-        return turtle_dot
-
-    def _move_the_turtle(self):
-        ''' Move the turtle after each click '''
-        self._turtle_dot = self._find_the_turtle()
-        if self._turtle_dot is None:
-            return
-
-        # Given the col and row of the turtle, do something
-        new_dot = self._grid_to_dot(
-            self._my_strategy_import(self.strategy,
-                                     self._dot_to_grid(self._turtle_dot)))
-        self._move_turtle(self._dots[new_dot].get_xy())
+    def _move_the_turtle(self, blocked):
+        ''' Move the turtle after each click. The strategy runs in a
+        thread so that the pond keeps drawing; _turtle_moved applies
+        its move on the main loop. '''
+        self._thinking = True
+        self._clicked = blocked
+        if self._thinking_serial == self._move_serial:
+            self._thinking_board.block(blocked)  # just catch up
+        else:  # first move of the game
+            self._thinking_board.set_snapshot(*self._board.get_snapshot())
+            self._thinking_serial = self._move_serial
+        self._thinking_board.set_orientation(self._board.get_orientation())
+        self._thinking_id = GLib.timeout_add(THINKING_DELAY,
+                                             self._show_thinking)
+        thread = threading.Thread(
+            target=self._think,
+            args=(self.strategy, self.level, self._move_serial))
+        thread.daemon = True
+        thread.start()
+
+    def _think(self, f, level, serial):
+        ''' Run Python code passed as argument (in a thread) '''
+        board = self._thinking_board
+        pos = orientation = error = record = None
+        profiling, profiles = self._profiling, self._profiles
+        start = time.time()
+        try:
+            if level == CUSTOM and self._worker is not None:
+                # Custom code runs in its own process, with time limits
+                pos, orientation = self._worker.move(f, board, profiling)
+                record = self._worker.last_profile
+            else:
+                function = load_strategy(f)
+                turtle = board._dot_to_grid(board.get_turtle())
+                if profiling:
+                    pos, record = profile_call(function, board, turtle)
+                else:
+                    pos = function(board, turtle)
+                orientation = board.get_orientation()
+        except StrategyError as e:
+            error = str(e)
+        except BaseException as e:
+            traceback.print_exc()
+            error = error_message(e)
+        if perf.counters is not None:
+            perf.counters.add_time('strategy-moves', time.time() - start)
+        if record is not None:
+            GLib.idle_add(self._add_profile, profiles, f, record)
+        GLib.idle_add(self._turtle_moved, serial, pos, orientation, error)
+
+    def _turtle_moved(self, serial, pos, orientation, error):
+        ''' Move the turtle where the strategy said '''
+        self._thinking = False
+        self._hide_thinking()
+        if serial != self._move_serial:
+            return False  # a new game has started since
+        if error is None:
+            try:
+                self._board.set_orientation(orientation)
+                new_dot = self._board.move_turtle(pos)
+            except (ValueError, TypeError, IndexError) as e:
+                error = error_message(e)
+        self._move_log.ply(self._clicked, self._board.get_turtle(),
+                           self._board.get_orientation())
+        if error is not None:
+            self._set_label(error)
+            return False
+
+        self._thinking_board.move_turtle(pos)
+        self._move_turtle(new_dot)
         # And set the orientation
-        self._turtle.set_shape(self._turtle_images[self._orientation])
+        self._orientation = self._board.get_orientation()
+        self._set_turtle_shape()
+        self._test_game_over(new_dot)
+        self._autosave()
+        return False
+
+    def _show_thinking(self):
+        self._thinking_id = None
+        self._set_label(_('The turtle is thinking…'))
+        return False
 
-        return new_dot
+    def _hide_thinking(self):
+        if self._thinking_id is not None:
+            GLib.source_remove(self._thinking_id)
+            self._thinking_id = None
+        else:
+            self._set_label('')
 
     def _test_game_over(self, new_dot):
         ''' Check to see if game is over '''
         if new_dot is None:
             return
-        if self._dots[new_dot].type is None:
+        state = self._board.test_game_over(new_dot)
+        if state != NOT_OVER:
+            self.game_stop_time = time.time()
+            self._move_log.end_game(state)
+            self._stats.record(
+                self.level, self._strategy_key(), state == TRAPPED,
+                self.game_stop_time - self.game_start_time,
+                self._board.moves, self.game_stop_time)
+        if state == ESCAPED:
             # Game-over feedback
             self._once_around = False
-            self.game_stop_time = time.time()
             self.gameover_flag = True
             self._happy_turtle_dance()
             self._timeout_id = GLib.timeout_add(10000, self._game_over)
             return True
-        c = int(self._turtle_dot / THIRTEEN) % 2
-        if self._dots[
-            new_dot + CIRCLE[c][0][0] + THIRTEEN * CIRCLE[c][0][1]].type and \
-           self._dots[
-            new_dot + CIRCLE[c][1][0] + THIRTEEN * CIRCLE[c][1][1]].type and \
-           self._dots[
-            new_dot + CIRCLE[c][2][0] + THIRTEEN * CIRCLE[c][2][1]].type and \
-           self._dots[
-            new_dot + CIRCLE[c][3][0] + THIRTEEN * CIRCLE[c][3][1]].type and \
-           self._dots[
-            new_dot + CIRCLE[c][4][0] + THIRTEEN * CIRCLE[c][4][1]].type and \
-           self._dots[
-            new_dot + CIRCLE[c][5][0] + THIRTEEN * CIRCLE[c][5][1]].type:
-           # Game-over feedback
-           for dot in self._dots:
-               dot.set_label(':)')
-               self.game_stop_time = time.time()
-               self.gameover_flag = True
-           self._timeout_id = GLib.timeout_add(4000, self._game_over)
-           return True
+        if state == TRAPPED:
+            # Game-over feedback
+            for dot in self._pond_dots:
+                dot.set_label(':)')
+            self.gameover_flag = True
+            self._timeout_id = GLib.timeout_add(4000, self._game_over)
+            return True
         return False
 
     def _game_over(self):
-        best_seconds = self.best_time % 60
-        best_minutes = self.best_time // 60
         self.elapsed_time = int(self.game_stop_time - self.game_start_time)
+        # This game has been counted already
+        stats = self.get_stats()
+        best_time = None if stats is None else stats.best()
         second = self.elapsed_time % 60
         minute = self.elapsed_time // 60
         for dot in self._dots:
@@ -310,7 +555,7 @@ class Game():
             self._gameover.append(
                 Sprite(self._sprites,
                        offset_x + (x - 0.50) * self._dot_size_gameover,
-                       y * (self._dot_size + self._space) + offset_y,
+                       y * self._gameover_row + offset_y,
                        self._new_dot(self._colors[FILL],
                                      self._dot_size_gameover)))
             self._gameover[-1].type = -1  # No image
@@ -327,7 +572,7 @@ class Game():
             self._win_lose.append(
                 Sprite(self._sprites,
                        offset_x + (x - 0.50) * self._dot_size_gameover,
-                       y * (self._dot_size + self._space) + offset_y,
+                       y * self._gameover_row + offset_y,
                        self._new_dot(self._colors[FILL],
                                      self._dot_size_gameover)))
             self._win_lose[-1].type = -1  # No image
@@ -352,7 +597,7 @@ class Game():
         ]
         if self.game_lost:
             self.rings(len(text_lose), text_lose, self._win_lose)
-        elif self.elapsed_time <= self.best_time:
+        elif best_time is not None and self.elapsed_time <= best_time:
             self.rings(
                 len(text_win_best_time),
                 text_win_best_time,
@@ -364,7 +609,7 @@ class Game():
             self._your_time.append(
                 Sprite(self._sprites,
                        offset_x + x * self._dot_size_gameover,
-                       y * (self._dot_size + self._space),
+                       y * self._gameover_row,
                        self._new_dot(self._colors[FILL],
                                      self._dot_size_gameover)))
             self._your_time[-1].type = -1  # No image
@@ -380,23 +625,23 @@ class Game():
             self._best_time.append(
                 Sprite(self._sprites,
                        offset_x + x * self._dot_size_gameover,
-                       y * (self._dot_size + self._space),
+                       y * self._gameover_row,
                        self._new_dot(self._colors[FILL],
                                      self._dot_size_gameover)))
             self._best_time[-1].type = -1  # No image
             self._best_time[-1].set_label_attributes(72)
-        if self.elapsed_time <= self.best_time and not self.game_lost:
-            self.best_time = self.elapsed_time
-            best_seconds = second
-            best_minutes = minute
         text = [
             "  best  ",
             " time:  ",
-            (' {:02d}:{:02d} '.format(best_minutes, best_seconds))
+            ' --:-- ' if best_time is None else
+            (' {:02d}:{:02d} '.format(int(best_time) // 60,
+                                      int(best_time) % 60))
         ]
         self.rings(len(text), text, self._best_time)
-        self.save_best_time()
-        self._timeout_id = GLib.timeout_add(7000, self.new_game)
+        if stats is not None:
+            self._set_label(_('Won {} of {}, {} in a row').format(
+                stats.wins, stats.games, stats.streak))
+        self._timeout_id = GLib.timeout_add(7000, self._new_game_timeout)
 
     def rings(self, num, text, shape):
         i = 0
@@ -405,118 +650,95 @@ class Game():
             shape[x].set_shape(self._new_dot(
                         self._colors[FILL], self._dot_size_gameover))
             shape[x].set_label(text[i])
-            shape[x].set_layer(100)
+            shape[x].set_layer(DOT_LAYER)
             i += 1
 
-    def _grid_to_dot(self, pos):
-        ''' calculate the dot index from a column and row in the grid '''
-        return pos[0] + pos[1] * THIRTEEN
-
-    def _dot_to_grid(self, dot):
-        ''' calculate the grid column and row for a dot '''
-        return [dot % THIRTEEN, int(dot / THIRTEEN)]
-
     def _happy_turtle_dance(self):
         ''' Turtle dances along the edge '''
+        self._dance_id = None
         self.game_lost = True
-        i = self._find_the_turtle()
-        if i == 0:
+        i = self._turtle_dot
+        if i == self._board.first_edge():
             if self._once_around:
                 return
             else:
                 self._once_around = True
         _logger.debug(i)
-        x, y = self._dot_to_grid(i)
-        if y == 0:
-            x += 1
-        if x == 0:
-            y -= 1
-        if x == THIRTEEN - 1:
-            y += 1
-        if y == THIRTEEN - 1:
-            x -= 1
-        i = self._grid_to_dot((x, y))
+        i = self._board.next_edge(i)
         self._dots[i].set_label(':)')
-        self._move_turtle(self._dots[i].get_xy())
+        self._move_turtle(i)
         self._orientation += 1
         self._orientation %= 6
-        self._turtle.set_shape(self._turtle_images[self._orientation])
-        self._timeout_id = GLib.timeout_add(250, self._happy_turtle_dance)
-
-    def _ordered_weights(self, pos):
-        ''' Returns the list of surrounding points sorted by their
-        distance to the edge '''
-        dots = self._surrounding_dots(pos)
-        dots_and_weights = []
-        for dot in dots:
-            dots_and_weights.append((dot, self._weights[dot]))
-        sorted_dots = sorted(dots_and_weights, key=lambda foo: foo[1])
-        for i in range(6):
-            dots[i] = sorted_dots[i][0]
-        return dots
-
-    def _daylight_ahead(self, pos):
-        ''' Returns true if there is a straight path to the edge from
-        the current position/orientation '''
-        dots = self._surrounding_dots(pos)
-        while True:
-            dot_type = self._dots[dots[self._orientation]].type
-            if dot_type is None:
-                return True
-            elif dot_type:
-                return False
-            else:  # keep looking
-                pos = self._dot_to_grid(dots[self._orientation])
-                dots = self._surrounding_dots(pos)
-
-    def _surrounding_dots(self, pos):
-        ''' Returns dots surrounding a position in the grid '''
-        dots = []
-        evenodd = pos[1] % 2
-        for i in range(6):
-            col = pos[0] + CIRCLE[evenodd][i][0]
-            row = pos[1] + CIRCLE[evenodd][i][1]
-            dots.append(self._grid_to_dot((col, row)))
-        return dots
-
-    def _initialize_weights(self):
-        ''' How many steps to an edge? '''
-        self._weights = []
-        for d, dot in enumerate(self._dots):
-            if dot.type is None:
-                self._weights.append(0)
-            elif dot.type:
-                self._weights.append(1000)
-            else:
-                pos = self._dot_to_grid(d)
-                pos2 = (THIRTEEN - pos[0], THIRTEEN - pos[1])
-                self._weights.append(min(min(pos[0], pos2[0]),
-                                         min(pos[1], pos2[1])))
-    def _my_strategy_import(self, f, arg):
-        ''' Run Python code passed as argument '''
-        userdefined = {}
-        try:
-            exec(f, globals(), userdefined)
-            return userdefined['_turtle_strategy'](self, arg)
-        except ZeroDivisionError as e:
-            self._set_label('Python zero-divide error: {}'.format(e))
-        except ValueError as e:
-            self._set_label('Python value error: {}'.format(e))
-        except SyntaxError as e:
-            self._set_label('Python syntax error: {}'.format(e))
-        except NameError as e:
-            self._set_label('Python name error: {}'.format(e))
-        except OverflowError as e:
-            self._set_label('Python overflow error: {}'.format(e))
-        except TypeError as e:
-            self._set_label('Python type error: {}'.format(e))
-        except:
-            self._set_label('Python error')
-        traceback.print_exc()
-        return None
+        self._set_turtle_shape()
+        self._dance_id = GLib.timeout_add(250, self._happy_turtle_dance)
 
     def __draw_cb(self, canvas, cr):
+        counters = perf.counters
+        if counters is None:
+            self._sprites.redraw_sprites(cr=cr)
+            return
+        x1, y1, x2, y2 = cr.clip_extents()
+        start = time.time()
         self._sprites.redraw_sprites(cr=cr)
+        counters.frame(time.time() - start, (x2 - x1) * (y2 - y1))
+        if counters.outline:
+            # Alternate colors so that back-to-back redraws show up
+            cr.set_source_rgb(*[(1, 0, 1), (0, 0.8, 1)][
+                counters.counts['redraw'] % 2])
+            cr.set_line_width(2)
+            cr.rectangle(x1 + 1, y1 + 1, x2 - x1 - 2, y2 - y1 - 2)
+            cr.stroke()
+        self._draw_overlay(cr, counters)
+
+    def _draw_overlay(self, cr, counters):
+        ''' Show frames per second, draw time and damaged area '''
+        fps, draw_ms, damaged = counters.rolling()
+        cr.save()
+        cr.rectangle(*OVERLAY_RECT)
+        cr.set_source_rgba(0, 0, 0, 0.6)
+        cr.fill()
+        cr.set_source_rgb(1, 1, 1)
+        cr.set_font_size(14)
+        cr.move_to(8, 18)
+        cr.show_text('{:.0f} fps  {:.2f} ms/draw  {:.0f} px'.format(
+            fps, draw_ms, damaged))
+        cr.move_to(8, 36)
+        cr.show_text('{} draws  {} invals  {} svg  {} moves'.format(
+            counters.counts.get('redraw', 0),
+            counters.counts.get('queue-draw-area', 0),
+            counters.counts.get('svg-rasterized', 0),
+            counters.counts.get('strategy-moves', 0)))
+        cr.restore()
+
+    def _refresh_overlay(self):
+        ''' Keep the overlay current (this redraw shows in it too) '''
+        self._canvas.queue_draw_area(*OVERLAY_RECT)
+        return True
+
+    def _set_counting(self, level):
+        ''' 0: off; 1: counters and overlay; 2: outline redraws too '''
+        self._sprites.counters = perf.set_counting(level)
+        if level > 0 and self._overlay_id is None:
+            self._overlay_id = GLib.timeout_add(OVERLAY_INTERVAL,
+                                                self._refresh_overlay)
+        elif level == 0 and self._overlay_id is not None:
+            GLib.source_remove(self._overlay_id)
+            self._overlay_id = None
+        self._canvas.queue_draw()
+
+    def _key_press_cb(self, win, event):
+        if event.keyval not in (Gdk.KEY_d, Gdk.KEY_D) or \
+           event.state & Gdk.ModifierType.CONTROL_MASK == 0 or \
+           event.state & Gdk.ModifierType.SHIFT_MASK == 0:
+            return False
+        level = (perf.counting_level() + 1) % 3
+        if level == 0:
+            path = os.path.join(get_activity_root(), 'data',
+                                'perf-counters.txt')
+            perf.counters.dump(path)
+            self._set_label(path)
+        self._set_counting(level)
+        return True
 
     def do_expose_event(self, event):
         ''' Handle the expose-event by drawing '''
@@ -532,27 +754,64 @@ class Game():
         Gtk.main_quit()
 
     def _new_dot(self, color, dot_size):
-        ''' generate a dot of a color color '''
+        ''' generate a dot of a color color; every sprite with the
+        same color and size shares the same (unmodified) image '''
+        if self._dot_cache_owner != (tuple(self._colors), self._scale):
+            # Profile colors or scale changed: start again
+            self._dot_cache.clear()
+            self._dot_cache_owner = (tuple(self._colors), self._scale)
+        key = (color, dot_size)
+        if key in self._dot_cache:
+            self._dot_cache.move_to_end(key)
+            return self._dot_cache[key]
         self._stroke = color
         self._fill = color
         self._svg_width = dot_size
         self._svg_height = dot_size
-        return svg_str_to_pixbuf(
-            self._header() + \
+        source = self._header() + \
             self._circle(dot_size / 2., dot_size / 2.,
                          dot_size / 2.) + \
-            self._footer())
+            self._footer()
+        if dot_size == self._dot_size_gameover:
+            slot = 'dot-{}-gameover'.format(color.lstrip('#'))
+        else:
+            slot = 'dot-{}'.format(color.lstrip('#'))
+        pixbuf = self._raster_cache.get_pixbuf(slot, source)
+        if pixbuf is None:
+            pixbuf = svg_str_to_pixbuf(source)
+            self._raster_cache.put_pixbuf(slot, source, pixbuf)
+        self._dot_cache[key] = pixbuf
+        if len(self._dot_cache) > DOT_CACHE_SIZE:
+            self._dot_cache.popitem(last=False)
+        return pixbuf
 
     def _new_turtle(self):
         ''' generate a turtle '''
+        return svg_str_to_pixbuf(self._turtle_svg())
+
+    def _turtle_svg(self):
+        ''' the SVG source of the turtle '''
         self._svg_width = self._dot_size * 2
         self._svg_height = self._dot_size * 2
         self._stroke = '#101010'
         self._fill = '#404040'
-        return svg_str_to_pixbuf(
-            self._header() + \
-            self._turtle() + \
-            self._footer())
+        return self._header() + self._turtle_paths() + self._footer()
+
+    def _make_turtle_images(self):
+        ''' Load the six rotated turtles from the raster cache, or
+        render, rotate and cache them '''
+        source = self._turtle_svg()
+        images = [self._raster_cache.get_surface('turtle-%d' % i, source)
+                  for i in range(6)]
+        if None in images:
+            self._turtle_images = []
+            self._rotate_turtle(self._new_turtle())
+            for i, surface in enumerate(self._turtle_images):
+                self._raster_cache.put_surface('turtle-%d' % i, source,
+                                               surface)
+        else:
+            self._turtle_images = images
+            self._turtle_offset = int(self._dot_size / 2.)
 
     def _rotate_turtle(self, image):
         w, h = image.get_width(), image.get_height()
@@ -584,7 +843,7 @@ class Game():
     def _footer(self):
         return '</svg>\n'
 
-    def _turtle(self):
+    def _turtle_paths(self):
         svg = '<g\ntransform="scale(%.1f, %.1f)">\n' % (
             self._svg_width / 60., self._svg_height / 60.)
         svg += '%s%s%s%s%s%s%s%s' % ('  <path d="M 27.5 48.3 ',
@@ -663,34 +922,14 @@ class Game():
         svg += '</g>\n'
         return svg
 
-    def save_best_time(self):
-        file_path = os.path.join(get_activity_root(), 'data', 'best-time')
-        best_time = [180]
-        if os.path.exists(file_path):
-            with open(file_path, "r") as fp:
-                best_time = fp.readlines()
-        int_best_time = int(best_time[0])
-        if not int_best_time <= self.elapsed_time and not self.game_lost:
-            int_best_time = self.elapsed_time
-        with open(file_path, "w") as fp:
-            fp.write(str(int_best_time))
-
-    def load_best_time(self):
-        file_path = os.path.join(get_activity_root(), 'data', 'best-time')
-        if os.path.exists(file_path):
-            with open(file_path, "r") as fp:
-                highscore = fp.readlines()
-            try:
-                return int(highscore[0])
-            except (ValueError, IndexError) as e:
-                logging.exception(e)
-                return 0
-        return 0
 
 def svg_str_to_pixbuf(svg_string):
     """ Load pixbuf from SVG string """
+    start = time.time()
     pl = GdkPixbuf.PixbufLoader.new_with_type('svg') 
     pl.write(svg_string.encode())
     pl.close()
     pixbuf = pl.get_pixbuf()
+    if perf.counters is not None:
+        perf.counters.add_time('svg-rasterized', time.time() - start)
     return pixbuf
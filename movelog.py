@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+movelog.py records every game played as a compact binary log, and
+reads it back without a display, e.g.
+
+    python3 movelog.py moves.log                # one line per game
+    python3 movelog.py moves.log --game 3 --ply 12
+
+The file starts with a header and is only ever appended to. Each
+record starts with a tag byte:
+
+    G  a game starts: time, level, pond, turtle, orientation and the
+       dots blocked to start with
+    P  a ply: the dot clicked, the turtle's dot, its orientation and
+       the milliseconds since the game started (10 bytes)
+    E  the game is over: result and milliseconds
+
+A game with no E record was abandoned. A record cut short by a crash
+ends the log.
+'''
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+
+from array import array
+
+from board import Board, Pond, dots_of, ESCAPED, TRAPPED
+
+import logging
+_logger = logging.getLogger('turtle-in-a-pond-activity')
+
+MAGIC = b'TPML'
+VERSION = 1
+GAME = struct.Struct('<cdBH')  # tag, time, level, length of pond
+GAME_START = struct.Struct('<HBH')  # turtle, orientation, blocked dots
+PLY = struct.Struct('<cHHBI')
+END = struct.Struct('<cBI')
+FLUSH_SIZE = 4096  # bytes
+FLUSH_INTERVAL = 5  # seconds
+MAX_LOG_SIZE = 4 * 1024 * 1024  # then start a new file
+KEYFRAME_INTERVAL = 16  # plies
+RESULTS = {None: 'abandoned', ESCAPED: 'escaped', TRAPPED: 'trapped'}
+
+
+class MoveLogWriter():
+    ''' Appends games to a move log, a buffer at a time '''
+
+    def __init__(self, path):
+        self._path = path
+        self._buffer = bytearray()
+        self._flushed = time.time()
+        self._started = None
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > MAX_LOG_SIZE:
+                os.replace(path, path + '.1')
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                self._buffer += MAGIC + bytes([VERSION])
+        except OSError as e:
+            _logger.debug('move log unavailable: {}'.format(e))
+            self._path = None
+
+    def start_game(self, level, pond, blocked, turtle, orientation):
+        ''' Record the start of a game '''
+        self._started = time.time()
+        description = json.dumps(pond.describe()).encode('utf-8')
+        self._buffer += GAME.pack(b'G', self._started, level,
+                                  len(description))
+        self._buffer += description
+        self._buffer += GAME_START.pack(turtle, orientation, len(blocked))
+        dots = array('H', blocked)
+        if sys.byteorder == 'big':
+            dots.byteswap()  # little-endian, like the rest
+        self._buffer += dots.tobytes()
+
+    def ply(self, clicked, turtle, orientation):
+        ''' Record a click and where the turtle went '''
+        if self._started is None:
+            return
+        self._buffer += PLY.pack(b'P', clicked, turtle, orientation,
+                                 self._elapsed())
+        if len(self._buffer) > FLUSH_SIZE or \
+           time.time() - self._flushed > FLUSH_INTERVAL:
+            self.flush()
+
+    def end_game(self, result):
+        ''' Record how the game ended '''
+        if self._started is None:
+            return
+        self._buffer += END.pack(b'E', result, self._elapsed())
+        self._started = None
+        self.flush()
+
+    def _elapsed(self):
+        return int((time.time() - self._started) * 1000)
+
+    def flush(self):
+        ''' Write out what has been buffered '''
+        self._flushed = time.time()
+        if self._path is None:
+            del self._buffer[:]  # nowhere to write it
+            return
+        if len(self._buffer) == 0:
+            return
+        try:
+            with open(self._path, 'ab') as fp:
+                fp.write(self._buffer)
+        except OSError as e:
+            _logger.debug('cannot write move log: {}'.format(e))
+        del self._buffer[:]
+
+
+class LoggedGame():
+    ''' One game from a move log. Every KEYFRAME_INTERVAL plies the
+    position is kept whole, so any ply is a keyframe plus a few
+    clicks away. '''
+
+    def __init__(self, started, level, pond, turtle, orientation, blocked):
+        self.started = started
+        self.level = level
+        self.pond = pond
+        self.blocked = blocked
+        self.clicks = array('H')
+        self.turtles = array('H')
+        self.orientations = bytearray()
+        self.times = array('I')
+        self.result = None
+        self.duration = None
+        bits = 0
+        for dot in blocked:
+            bits |= 1 << dot
+        self._keyframes = [(bits, turtle, orientation)]
+        self._bits = bits
+
+    def __len__(self):
+        return len(self.clicks)
+
+    def _add_ply(self, clicked, turtle, orientation, elapsed):
+        self.clicks.append(clicked)
+        self.turtles.append(turtle)
+        self.orientations.append(orientation)
+        self.times.append(elapsed)
+        self._bits |= 1 << clicked
+        if len(self.clicks) % KEYFRAME_INTERVAL == 0:
+            self._keyframes.append((self._bits, turtle, orientation))
+
+    def position(self, ply):
+        ''' Return (blocked dots as a bitboard, turtle, orientation)
+        after ply plies '''
+        if ply < 0 or ply > len(self.clicks):
+            raise IndexError('no ply {} in a game of {}'.format(
+                ply, len(self.clicks)))
+        bits, turtle, orientation = self._keyframes[ply // KEYFRAME_INTERVAL]
+        for i in range(ply - ply % KEYFRAME_INTERVAL, ply):
+            bits |= 1 << self.clicks[i]
+            turtle = self.turtles[i]
+            orientation = self.orientations[i]
+        return bits, turtle, orientation
+
+    def board(self, ply):
+        ''' Return a Board set up as it was after ply plies '''
+        bits, turtle, orientation = self.position(ply)
+        board = Board(self.pond)
+        board.set_position(dots_of(bits), turtle, orientation)
+        board.moves = ply
+        return board
+
+
+def read_log(path):
+    ''' Return the games in a move log, oldest first '''
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('{} is not a move log'.format(path))
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError('move log version {} is not supported'.format(
+            data[len(MAGIC)]))
+    games = []
+    game = None
+    ponds = {}
+    offset = len(MAGIC) + 1
+    try:
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            if tag == b'P':
+                _, clicked, turtle, orientation, elapsed = \
+                    PLY.unpack_from(data, offset)
+                offset += PLY.size
+                if game is not None:
+                    game._add_ply(clicked, turtle, orientation, elapsed)
+            elif tag == b'G':
+                _, started, level, length = GAME.unpack_from(data, offset)
+                offset += GAME.size
+                description = bytes(data[offset:offset + length])
+                offset += length
+                if description not in ponds:
+                    ponds[description] = Pond.from_description(
+                        json.loads(description.decode('utf-8')))
+                turtle, orientation, count = \
+                    GAME_START.unpack_from(data, offset)
+                offset += GAME_START.size
+                blocked = array('H')
+                blocked.frombytes(data[offset:offset + 2 * count])
+                if len(blocked) != count:
+                    break  # cut short
+                if sys.byteorder == 'big':
+                    blocked.byteswap()
+                offset += 2 * count
+                game = LoggedGame(started, level, ponds[description],
+                                  turtle, orientation, tuple(blocked))
+                games.append(game)
+            elif tag == b'E':
+                _, result, elapsed = END.unpack_from(data, offset)
+                offset += END.size
+                if game is not None:
+                    game.result = result
+                    game.duration = elapsed
+                game = None
+            else:
+                _logger.debug('bad move log record at {}'.format(offset))
+                break
+    except struct.error:
+        pass  # the last record was cut short
+    return games
+
+
+def draw(board):
+    ''' Return the pond as text: o open, x blocked, . edge, T turtle '''
+    width = board.get_pond().width
+    lines = []
+    for row in range(board.get_pond().height):
+        line = ' ' if row % 2 == 1 else ''
+        for col in range(width):
+            dot = col + row * width
+            if dot == board.get_turtle():
+                line += 'T '
+            elif not board.in_pond(dot):
+                line += '  '
+            else:
+                line += {None: '.', False: 'o', True: 'x'}[
+                    board.get_type(dot)] + ' '
+        lines.append(line.rstrip())
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Read a Turtle in a Pond move log.')
+    parser.add_argument('file')
+    parser.add_argument('--game', type=int, default=None,
+                        help='show one game (0 is the first)')
+    parser.add_argument('--ply', type=int, default=None,
+                        help='with --game, draw the pond after this ply')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    games = read_log(args.file)
+    if args.game is None:
+        for i, game in enumerate(games):
+            print('{:5d} {} level {} {}x{} {:3d} plies {}'.format(
+                i, time.strftime('%Y-%m-%d %H:%M',
+                                 time.localtime(game.started)),
+                game.level, game.pond.width, game.pond.height, len(game),
+                RESULTS.get(game.result, game.result)))
+        print('{} games read in {:.3f} s'.format(len(games),
+                                                  time.time() - start))
+        return 0
+    game = games[args.game]
+    if args.ply is None:
+        for ply in range(len(game)):
+            print('{:3d} {:7.1f} s clicked {:4d} turtle {:4d} facing {}'.format(
+                ply + 1, game.times[ply] / 1000., game.clicks[ply],
+                game.turtles[ply], game.orientations[ply]))
+        print(RESULTS.get(game.result, game.result))
+    else:
+        print(draw(game.board(args.ply)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+perf.py records startup timing markers. Set TURTLEPOND_TIMING=1 in
+the environment to have each marker logged as it is reached, e.g.
+
+    imports: 180.2 ms
+    toolbar: 231.9 ms
+    board: 260.4 ms
+    first-frame: 301.7 ms
+
+It also keeps runtime counters: how often things happen (redraws,
+invalidated areas, label layouts, SVG rasterizations, strategy moves)
+and how long they take. They are off unless TURTLEPOND_PERF is set
+(1 for counters and the overlay, 2 to also outline what is redrawn),
+or turned on in the game with Ctrl+Shift+D. Code that counts checks
+that `perf.counters` is not None first, so counting costs nothing
+when it is off. At exit the counters are written to the file named
+by TURTLEPOND_PERF_DUMP, if set, so builds can be compared.
+'''
+
+import atexit
+import os
+import time
+
+from collections import defaultdict, deque
+
+import logging
+_logger = logging.getLogger('turtle-in-a-pond-activity')
+
+LOG_TIMING = os.environ.get('TURTLEPOND_TIMING', '') not in ('', '0')
+PERF_LEVEL = os.environ.get('TURTLEPOND_PERF', '')
+PERF_DUMP = os.environ.get('TURTLEPOND_PERF_DUMP', '')
+FRAME_WINDOW = 1.0  # seconds of frames in the rolling figures
+
+_start = time.time()
+_marks = []
+
+
+def mark(name):
+    ''' Record that startup has reached a named point '''
+    now = time.time()
+    _marks.append((name, now - _start))
+    if LOG_TIMING:
+        _logger.info('{}: {:.1f} ms'.format(name, (now - _start) * 1000))
+
+
+def get_marks():
+    ''' Return a list of (name, seconds since start) '''
+    return list(_marks)
+
+
+class Counters():
+    ''' Named counts and accumulated times. Strategies count from
+    their thread, so an occasional count may be lost; they are only
+    meant to show where the time goes. '''
+
+    def __init__(self, outline=False):
+        self.outline = outline  # outline the areas redrawn
+        self.counts = defaultdict(int)
+        self.times = defaultdict(float)
+        self._frames = deque()  # (time, draw seconds, damaged pixels)
+        self.started = time.time()
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def add_time(self, name, seconds):
+        self.counts[name] += 1
+        self.times[name] += seconds
+
+    def frame(self, seconds, damaged):
+        ''' Note a redraw: how long it took and how many pixels it
+        covered '''
+        now = time.time()
+        self.add_time('redraw', seconds)
+        self.count('damaged-pixels', int(damaged))
+        self._frames.append((now, seconds, damaged))
+        while self._frames[0][0] < now - FRAME_WINDOW:
+            self._frames.popleft()
+
+    def rolling(self):
+        ''' Return (frames per second, ms per draw, damaged pixels per
+        frame) over the last FRAME_WINDOW seconds '''
+        now = time.time()
+        while len(self._frames) > 0 and \
+                self._frames[0][0] < now - FRAME_WINDOW:
+            self._frames.popleft()
+        n = len(self._frames)
+        if n == 0:
+            return 0, 0, 0
+        return (n / FRAME_WINDOW,
+                sum([frame[1] for frame in self._frames]) * 1000 / n,
+                sum([frame[2] for frame in self._frames]) / n)
+
+    def report(self):
+        ''' Return the counters as text, one per line '''
+        lines = ['# {:.1f} s'.format(time.time() - self.started)]
+        for name, seconds in _marks:
+            lines.append('mark {} {:.1f} ms'.format(name, seconds * 1000))
+        for name in sorted(self.counts):
+            if name in self.times:
+                lines.append('{} {} {:.1f} ms'.format(
+                    name, self.counts[name], self.times[name] * 1000))
+            else:
+                lines.append('{} {}'.format(name, self.counts[name]))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        ''' Write report() to a file '''
+        try:
+            with open(path, 'w') as fp:
+                fp.write(self.report())
+        except OSError as e:
+            _logger.debug('cannot write {}: {}'.format(path, e))
+
+
+counters = None
+
+
+def set_counting(level):
+    ''' 0: no counters; 1: counters and overlay; 2: outline redraws
+    too. Counts so far are kept while counting goes on. '''
+    global counters
+    if level == 0:
+        counters = None
+    elif counters is None:
+        counters = Counters(level > 1)
+    else:
+        counters.outline = level > 1
+    return counters
+
+
+def counting_level():
+    if counters is None:
+        return 0
+    return 2 if counters.outline else 1
+
+
+def _dump_at_exit():
+    if counters is not None and PERF_DUMP != '':
+        counters.dump(PERF_DUMP)
+
+
+if PERF_LEVEL not in ('', '0'):
+    set_counting(2 if PERF_LEVEL == '2' else 1)
+atexit.register(_dump_at_exit)
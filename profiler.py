@@ -0,0 +1,170 @@
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+profiler.py measures how long a strategy takes to move the turtle,
+and which of its lines the time goes on.
+
+profile_call() runs a strategy with a trace function that only looks
+at code compiled from strategy source (file name '<strategy>'); the
+board's own methods are not traced, and their time counts towards the
+strategy line that called them. Nothing is traced unless profiling
+has been turned on, and tracing slows the strategy down, so the times
+are for comparing moves and lines, not absolute.
+
+A StrategyProfile collects the moves of one strategy and reports
+them as text, e.g.
+
+    moves 24  wall p50 1.9 ms  p95 4.2 ms  max 6.0 ms
+    ...
+      line  hits     ms  source
+         5   312  20.14  for dot in CIRCLE[turtle[1] % 2]:
+'''
+
+import sys
+import time
+
+STRATEGY_FILE = '<strategy>'
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500]  # ms
+HOTSPOTS = 10  # lines in a report
+
+
+class _LineTracer():
+    ''' Counts the hits and (inclusive) time of each strategy line '''
+
+    def __init__(self):
+        self.lines = {}
+        self._last = {}  # frame -> (line, time it started)
+
+    def trace(self, frame, event, arg):
+        if frame.f_code.co_filename != STRATEGY_FILE:
+            return None  # not strategy code: don't trace it
+        return self._local
+
+    def _local(self, frame, event, arg):
+        now = time.perf_counter()
+        last = self._last.pop(frame, None)
+        if last is not None:
+            self.lines[last[0]][1] += now - last[1]
+        if event == 'line':
+            line = frame.f_lineno
+            if line not in self.lines:
+                self.lines[line] = [0, 0.]
+            self.lines[line][0] += 1
+            self._last[frame] = (line, now)
+        elif event != 'return':
+            if last is not None:
+                self._last[frame] = (last[0], now)
+        return self._local
+
+
+def profile_call(function, *args):
+    ''' Call function(*args) with strategy lines traced. Return the
+    result and a record of the call:
+    {'wall': s, 'cpu': s, 'lines': {line: [hits, s]}} '''
+    tracer = _LineTracer()
+    old = sys.gettrace()
+    start_cpu = time.thread_time()
+    start = time.perf_counter()
+    sys.settrace(tracer.trace)
+    try:
+        result = function(*args)
+    finally:
+        sys.settrace(old)
+        record = {'wall': time.perf_counter() - start,
+                  'cpu': time.thread_time() - start_cpu,
+                  'lines': tracer.lines}
+    return result, record
+
+
+def percentile(values, fraction):
+    ''' The value a fraction (0-1) of the way up the sorted values '''
+    if len(values) == 0:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class StrategyProfile():
+    ''' The profiled moves of one strategy '''
+
+    def __init__(self, source):
+        self.source = source
+        self.wall = []
+        self.cpu = []
+        self.lines = {}
+
+    def add(self, record):
+        ''' Add a record from profile_call(). Line numbers may have
+        become strings on the way through JSON. '''
+        self.wall.append(record['wall'])
+        self.cpu.append(record['cpu'])
+        for line, (hits, seconds) in record['lines'].items():
+            line = int(line)
+            if line not in self.lines:
+                self.lines[line] = [0, 0.]
+            self.lines[line][0] += hits
+            self.lines[line][1] += seconds
+
+    def __len__(self):
+        return len(self.wall)
+
+    def latency(self):
+        ''' Return (p50, p95, max) of the wall time in ms '''
+        if len(self.wall) == 0:
+            return 0, 0, 0
+        return (percentile(self.wall, 0.5) * 1000,
+                percentile(self.wall, 0.95) * 1000, max(self.wall) * 1000)
+
+    def histogram(self):
+        ''' Return [(upper bound in ms or None, moves)] of wall time '''
+        counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        for seconds in self.wall:
+            for i, bound in enumerate(HISTOGRAM_BUCKETS):
+                if seconds * 1000 <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return list(zip(HISTOGRAM_BUCKETS + [None], counts))
+
+    def summary(self):
+        ''' One line for the status label '''
+        p50, p95, most = self.latency()
+        return 'moves {}  wall p50 {:.1f} ms  p95 {:.1f} ms  ' \
+            'max {:.1f} ms'.format(len(self), p50, p95, most)
+
+    def report(self):
+        ''' The whole profile as text '''
+        lines = [self.summary()]
+        if len(self.cpu) > 0:
+            lines.append('cpu p50 {:.1f} ms  p95 {:.1f} ms  '
+                         'max {:.1f} ms'.format(
+                             percentile(self.cpu, 0.5) * 1000,
+                             percentile(self.cpu, 0.95) * 1000,
+                             max(self.cpu) * 1000))
+        lines.append('')
+        most = max([1] + [count for bound, count in self.histogram()])
+        for bound, count in self.histogram():
+            label = '> {} ms'.format(HISTOGRAM_BUCKETS[-1]) \
+                if bound is None else '<= {} ms'.format(bound)
+            lines.append('{:>10} {:5d} {}'.format(
+                label, count, '#' * int(40 * count / most)).rstrip())
+        lines.append('')
+        lines.append('  line  hits     ms  source')
+        source = self.source.split('\n')
+        hotspots = sorted(self.lines.items(), key=lambda item: -item[1][1])
+        for line, (hits, seconds) in hotspots[:HOTSPOTS]:
+            text = source[line - 1].strip() if 0 < line <= len(source) \
+                else ''
+            lines.append('{:6d} {:5d} {:6.2f}  {}'.format(
+                line, hits, seconds * 1000, text))
+        return '\n'.join(lines) + '\n'
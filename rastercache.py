@@ -0,0 +1,122 @@
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+rastercache.py keeps rendered images on disk so that the next launch
+can load PNGs instead of running SVG through librsvg again.
+
+Each image lives in a slot (e.g. 'turtle-3') and is keyed by a hash
+of the source it was rendered from, which includes its dimensions.
+Storing a new image in a slot removes the old one, so stale entries
+disappear as soon as the source or the size changes.
+'''
+
+from gi.repository import GdkPixbuf, GLib
+
+import cairo
+import hashlib
+import os
+import shutil
+
+import logging
+_logger = logging.getLogger('turtle-in-a-pond-activity')
+
+CACHE_VERSION = 1
+MAX_ENTRIES = 64
+
+
+class RasterCache():
+    ''' Rendered images kept on disk between launches '''
+
+    def __init__(self, path):
+        self._path = os.path.join(path, 'v%d' % CACHE_VERSION)
+        try:
+            if not os.path.exists(self._path):
+                os.makedirs(self._path)
+            # Entries written by other versions of the cache are stale
+            for name in os.listdir(path):
+                if name != 'v%d' % CACHE_VERSION:
+                    shutil.rmtree(os.path.join(path, name),
+                                  ignore_errors=True)
+        except OSError as e:
+            _logger.debug('raster cache unavailable: {}'.format(e))
+            self._path = None
+
+    def _file_path(self, slot, source):
+        key = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        return os.path.join(self._path, '{}-{}.png'.format(slot, key))
+
+    def get_pixbuf(self, slot, source):
+        ''' Return the cached pixbuf rendered from source, or None '''
+        if self._path is None:
+            return None
+        file_path = self._file_path(slot, source)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            return GdkPixbuf.Pixbuf.new_from_file(file_path)
+        except GLib.Error as e:
+            _logger.debug('bad raster cache entry {}: {}'.format(
+                file_path, e))
+            return None
+
+    def get_surface(self, slot, source):
+        ''' Return the cached image surface rendered from source, or
+        None '''
+        if self._path is None:
+            return None
+        file_path = self._file_path(slot, source)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            return cairo.ImageSurface.create_from_png(file_path)
+        except (cairo.Error, MemoryError, OSError) as e:
+            _logger.debug('bad raster cache entry {}: {}'.format(
+                file_path, e))
+            return None
+
+    def put_pixbuf(self, slot, source, pixbuf):
+        ''' Save a pixbuf rendered from source '''
+        self._put(slot, source,
+                  lambda path: pixbuf.savev(path, 'png', [], []))
+
+    def put_surface(self, slot, source, surface):
+        ''' Save an image surface rendered from source '''
+        self._put(slot, source, surface.write_to_png)
+
+    def _put(self, slot, source, write):
+        if self._path is None:
+            return
+        file_path = self._file_path(slot, source)
+        tmp_path = file_path + '.tmp'
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, file_path)
+            self._evict(slot, file_path)
+        except (GLib.Error, cairo.Error, OSError) as e:
+            _logger.debug('cannot write raster cache entry {}: {}'.format(
+                file_path, e))
+
+    def _evict(self, slot, keep):
+        ''' Remove older renderings in this slot and, if there are too
+        many entries, the least recently written ones. '''
+        entries = []
+        for name in os.listdir(self._path):
+            file_path = os.path.join(self._path, name)
+            if file_path == keep:
+                continue
+            if name.rsplit('-', 1)[0] == slot:
+                os.remove(file_path)
+            else:
+                entries.append((os.path.getmtime(file_path), file_path))
+        entries.sort()
+        while len(entries) >= MAX_ENTRIES:
+            os.remove(entries.pop(0)[1])
@@ -0,0 +1,377 @@
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+solver.py searches the game tree for the turtle or for the player
+blocking it. It is an alpha-beta search with iterative deepening:
+each move is searched one ply deeper than the last until time (or
+the node budget) runs out, so there is always an answer from the
+last search that finished.
+
+The turtle escapes as soon as it is next to an edge dot, since edge
+dots cannot be blocked. Wins and losses found within the horizon are
+exact; past the horizon, positions are scored by how far the turtle
+is from the edge and how many ways out it has.
+
+Positions are keyed by Zobrist hashing and kept in a bounded
+transposition table. When the pond looks the same upside down, a
+position and its mirror image share an entry.
+'''
+
+import random
+import time
+
+from collections import OrderedDict
+
+import logging
+_logger = logging.getLogger('turtle-in-a-pond-activity')
+
+SEARCH_TIME = 0.05  # seconds per move
+TABLE_SIZE = 100000  # positions kept in the transposition table
+MAX_DEPTH = 64
+TIME_CHECK = 128  # nodes between looks at the clock, on a 13x13 pond
+TIME_MARGIN = 0.1  # of the time limit, kept back for finishing up
+ZOBRIST_SEED = 13
+WIN = 1000000
+MATE_BOUND = WIN - 1000  # scores above this are proven wins
+INFINITY = WIN + 1
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class TranspositionTable():
+    ''' Search results by position. When it is full, the least recently
+    used entry is dropped; a deeper result for a position is never
+    replaced by a shallower one. '''
+
+    def __init__(self, size=TABLE_SIZE):
+        self._size = size
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        ''' Return (depth, value, flag, move) or None '''
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, depth, value, flag, move):
+        old = self._entries.get(key)
+        if old is not None:
+            self._entries.move_to_end(key)
+            if old[0] > depth:
+                return
+        self._entries[key] = (depth, value, flag, move)
+        if len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _mirror_of(board):
+    ''' Return the dot each dot maps to when the pond is turned upside
+    down, or None if that changes the pond. Only ponds with an odd
+    number of rows keep the hex layout when flipped. '''
+    pond = board.get_pond()
+    width, height = pond.width, pond.height
+    if height % 2 == 0:
+        return None
+    number_of_dots = board.number_of_dots()
+    mirror = [col + (height - 1 - row) * width
+              for row in range(height) for col in range(width)]
+    mirror.append(number_of_dots)  # the wall stays the wall
+    for dot in range(number_of_dots):
+        if board._types[dot] != board._types[mirror[dot]] or \
+           board.in_pond(dot) != board.in_pond(mirror[dot]):
+            return None
+        if sorted([mirror[neighbor] for neighbor in
+                   board._neighborhoods[dot]]) != \
+           sorted(board._neighborhoods[mirror[dot]]):
+            return None
+    return tuple(mirror)
+
+
+def _to_table(value, ply):
+    ''' Proven wins are stored relative to the position, not the root '''
+    if value > MATE_BOUND:
+        return value + ply
+    if value < -MATE_BOUND:
+        return value - ply
+    return value
+
+
+def _from_table(value, ply):
+    if value > MATE_BOUND:
+        return value - ply
+    if value < -MATE_BOUND:
+        return value + ply
+    return value
+
+
+class Solver():
+    ''' Searches positions on one board. Keep it for the whole game so
+    that the transposition table carries over from move to move. '''
+
+    def __init__(self, board, time_limit=SEARCH_TIME, node_limit=None,
+                 table_size=TABLE_SIZE):
+        self._board = board
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self._neighborhoods = board._neighborhoods
+        self._bits = board._bits
+        self._table = TranspositionTable(table_size)
+        self._mirror = _mirror_of(board)
+        # Our own generator: strategies rely on the random module
+        rng = random.Random(ZOBRIST_SEED)
+        size = board.number_of_dots() + 1
+        self._zobrist_blocked = [rng.getrandbits(64) for dot in range(size)]
+        self._zobrist_turtle = [rng.getrandbits(64) for dot in range(size)]
+        self._zobrist_blocker = rng.getrandbits(64)
+        self._history = [0] * size
+        # Nodes cost more on bigger ponds: look at the clock more often
+        self._time_check = max(1, TIME_CHECK * 169 // size)
+        self.last_search = None
+
+    def best_move(self):
+        ''' Return the dot the turtle should move to, or None if it is
+        trapped '''
+        return self._search_root(True)
+
+    def best_block(self):
+        ''' Return the dot to block, or None if nothing can be
+        blocked '''
+        return self._search_root(False)
+
+    def _setup(self):
+        ''' Copy the position off the board '''
+        board = self._board
+        self._types = [dot.type for dot in board._dots]
+        self._open = board.open_bits()
+        self._turtle = board.get_turtle()
+        self._weights = board._weights
+        mirror = self._mirror
+        self._hash = self._hash_mirrored = 0
+        for dot, type in enumerate(self._types[:-1]):
+            if type is True and board.in_pond(dot):
+                self._hash ^= self._zobrist_blocked[dot]
+                if mirror is not None:
+                    self._hash_mirrored ^= self._zobrist_blocked[mirror[dot]]
+        self._hash ^= self._zobrist_turtle[self._turtle]
+        if mirror is not None:
+            self._hash_mirrored ^= self._zobrist_turtle[mirror[self._turtle]]
+
+    def _search_root(self, turtle_to_move):
+        start = time.time()
+        self._setup()
+        self._nodes = 0
+        self._deadline = None if self.time_limit is None else \
+            start + self.time_limit * (1 - TIME_MARGIN)
+        types = self._types
+        neighborhood = self._neighborhoods[self._turtle]
+        if turtle_to_move:
+            moves = [dot for dot in neighborhood if types[dot] is not True]
+            for dot in moves:
+                if types[dot] is None:
+                    return dot  # out!
+        else:
+            moves = self._candidates(2)
+        if len(moves) == 0:
+            return None
+        best, score, depth = moves[0], 0, 0
+        try:
+            for depth in range(1, MAX_DEPTH + 1):
+                score = self._search(depth, -INFINITY, INFINITY, 0,
+                                     turtle_to_move)
+                entry = self._lookup(turtle_to_move)
+                if entry is not None and entry[3] is not None:
+                    best = entry[3]
+                if abs(score) > MATE_BOUND:
+                    break  # proven
+        except _OutOfTime:
+            depth -= 1
+        seconds = time.time() - start
+        self.last_search = {'depth': depth, 'nodes': self._nodes,
+                            'seconds': seconds, 'score': score,
+                            'nodes per second':
+                                self._nodes / max(seconds, 1e-9)}
+        _logger.debug('solver: depth {} score {} {} nodes {:.0f} '
+                      'nodes/s'.format(depth, score, self._nodes,
+                                       self.last_search['nodes per second']))
+        return best
+
+    def _lookup(self, turtle_to_move):
+        ''' Return the table entry for the position, with its move
+        turned the right way up '''
+        key, mirrored = self._key(turtle_to_move)
+        entry = self._table.get(key)
+        if entry is not None and mirrored and entry[3] is not None:
+            entry = entry[:3] + (self._mirror[entry[3]],)
+        return entry
+
+    def _key(self, turtle_to_move):
+        key = self._hash
+        if self._mirror is not None and self._hash_mirrored < key:
+            key = self._hash_mirrored
+            mirrored = True
+        else:
+            mirrored = False
+        if not turtle_to_move:
+            key ^= self._zobrist_blocker
+        return key, mirrored
+
+    def _search(self, depth, alpha, beta, ply, turtle_to_move):
+        ''' Negamax: the score is for the side to move '''
+        self._nodes += 1
+        if self.node_limit is not None and self._nodes > self.node_limit:
+            raise _OutOfTime()
+        if self._deadline is not None and \
+           self._nodes % self._time_check == 0 and \
+           time.time() > self._deadline:
+            raise _OutOfTime()
+        types = self._types
+        neighborhood = self._neighborhoods[self._turtle]
+        # The turtle gets out as soon as it is next to an edge
+        if self._bits.neighbors[self._turtle] & self._bits.edge:
+            if turtle_to_move:
+                return WIN - ply
+            return -(WIN - ply - 1)
+        if turtle_to_move:
+            moves = [dot for dot in neighborhood if types[dot] is False]
+            if len(moves) == 0:
+                return -(WIN - ply)  # trapped
+        if depth <= 0:
+            score = self._evaluate()
+            return score if turtle_to_move else -score
+        if not turtle_to_move:
+            moves = self._candidates(depth)
+            if len(moves) == 0:
+                return -self._evaluate()
+
+        key, mirrored = self._key(turtle_to_move)
+        entry = self._table.get(key)
+        hint = None
+        if entry is not None:
+            entry_depth, value, flag, hint = entry
+            if mirrored and hint is not None:
+                hint = self._mirror[hint]
+            if entry_depth >= depth:
+                value = _from_table(value, ply)
+                if flag == EXACT or \
+                   (flag == LOWER and value >= beta) or \
+                   (flag == UPPER and value <= alpha):
+                    return value
+        if turtle_to_move:
+            weights = self._weights
+            moves.sort(key=weights.__getitem__)
+        if hint in moves:
+            moves.remove(hint)
+            moves.insert(0, hint)
+
+        original_alpha = alpha
+        best, chosen = -INFINITY, None
+        for move in moves:
+            if turtle_to_move:
+                turtle = self._turtle
+                self._move(turtle, move)
+                value = -self._search(depth - 1, -beta, -alpha, ply + 1,
+                                      False)
+                self._move(move, turtle)
+            else:
+                self._block(move)
+                value = -self._search(depth - 1, -beta, -alpha, ply + 1,
+                                      True)
+                self._block(move)
+            if value > best:
+                best, chosen = value, move
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        if not turtle_to_move:
+                            self._history[move] += depth * depth
+                        break
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if mirrored:
+            chosen = self._mirror[chosen]
+        self._table.put(key, depth, _to_table(best, ply), flag, chosen)
+        return best
+
+    def _move(self, old, new):
+        self._turtle = new
+        zobrist = self._zobrist_turtle
+        self._hash ^= zobrist[old] ^ zobrist[new]
+        if self._mirror is not None:
+            mirror = self._mirror
+            self._hash_mirrored ^= zobrist[mirror[old]] ^ zobrist[mirror[new]]
+
+    def _block(self, dot):
+        ''' Block an open dot, or open it again '''
+        self._types[dot] = not self._types[dot]
+        self._open ^= 1 << dot
+        self._hash ^= self._zobrist_blocked[dot]
+        if self._mirror is not None:
+            self._hash_mirrored ^= self._zobrist_blocked[self._mirror[dot]]
+
+    def _candidates(self, depth):
+        ''' The open dots worth blocking: those the turtle could reach
+        before the search runs out, plus one more step '''
+        types = self._types
+        neighborhoods = self._neighborhoods
+        radius = (depth + 1) // 2 + 1
+        turtle = self._turtle
+        steps = {turtle: 0}
+        frontier = [turtle]
+        for step in range(1, radius + 1):
+            next_frontier = []
+            for dot in frontier:
+                for neighbor in neighborhoods[dot]:
+                    if neighbor not in steps and types[neighbor] is False:
+                        steps[neighbor] = step
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        del steps[turtle]
+        history = self._history
+        weights = self._weights
+        return sorted(steps, key=lambda dot: (-history[dot],
+                                              steps[dot] + weights[dot]))
+
+    def _evaluate(self):
+        ''' Score the position for the turtle: closer to the edge, and
+        with more ways out, is better. A turtle that cannot reach the
+        edge at all has lost, but would rather have room to move. The
+        region the turtle can reach grows a ring at a time, as a
+        bitboard. '''
+        bits = self._bits
+        reach = 1 << self._turtle
+        distance = 0
+        while True:
+            grown = bits.grow(reach)
+            distance += 1
+            exits = grown & bits.edge
+            if exits:
+                return -100 * distance + 10 * min(bin(exits).count('1'), 9)
+            grown = (grown & self._open) | reach
+            if grown == reach:
+                return -(WIN // 2) + bin(reach).count('1')
+            reach = grown
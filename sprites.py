@@ -83,6 +83,12 @@ from gi.repository import Gtk, GdkPixbuf, Gdk
 from gi.repository import Pango, PangoCairo
 import cairo
 
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+LAYOUT_CACHE_SIZE = 256
+MAX_DAMAGE_RECTS = 32
+
 
 class Sprites:
     ''' A class for the list of sprites and everything they share in common '''
@@ -91,7 +97,18 @@ class Sprites:
         ''' Initialize an empty array of sprites '''
         self.cr = None
         self.widget = widget
-        self.list = []
+        self.list = []  # in drawing order
+        self._keys = []  # (layer, sequence) of each sprite in self.list
+        self._key_of = {}
+        self._sequence = 0
+        self._grid = None  # optional spatial index
+        self._grid_size = 0
+        self._cells = {}
+        self._layouts = OrderedDict()
+        self._static_layer = None  # optional retained layers
+        self._static_surface = None
+        self._static_damage = []
+        self.counters = None  # optional perf.Counters
 
     def set_cairo_context(self, cr):
         ''' Cairo context may be set or reset after __init__ '''
@@ -108,26 +125,125 @@ class Sprites:
         ''' How many sprites are there? '''
         return(len(self.list))
 
+    def _next_sequence(self):
+        self._sequence += 1
+        return self._sequence
+
     def append_to_list(self, spr):
         ''' Append a new sprite to the end of the list. '''
-        self.list.append(spr)
+        if spr in self._key_of:
+            self.remove_from_list(spr)
+        if len(self._keys) > 0:
+            layer = max(spr.layer, self._keys[-1][0])
+        else:
+            layer = spr.layer
+        self._add(spr, (layer, self._next_sequence()))
 
     def insert_in_list(self, spr, i):
         ''' Insert a sprite at position i. '''
-        if i < 0:
-            self.list.insert(0, spr)
-        elif i > len(self.list) - 1:
-            self.list.append(spr)
+        if spr in self._key_of:
+            self.remove_from_list(spr)
+        if i > len(self.list) - 1:
+            self.append_to_list(spr)
+            return
+        # Make up a key that sorts between the sprites either side
+        above = self._keys[max(i, 0)]
+        if i > 0 and self._keys[i - 1][0] == above[0]:
+            key = (above[0], (self._keys[i - 1][1] + above[1]) / 2.)
         else:
-            self.list.insert(i, spr)
+            key = (above[0], above[1] - 0.5)
+        self._add(spr, key)
+
+    def insert_by_layer(self, spr):
+        ''' Insert a sprite on top of the other sprites in its layer. '''
+        if spr in self._key_of:
+            self.remove_from_list(spr)
+        self._add(spr, (spr.layer, self._next_sequence()))
 
     def remove_from_list(self, spr):
         ''' Remove a sprite from the list. '''
-        if spr in self.list:
-            self.list.remove(spr)
+        key = self._key_of.pop(spr, None)
+        if key is not None:
+            i = bisect_left(self._keys, key)
+            del self._keys[i]
+            del self.list[i]
+        self._unindex(spr)
+
+    def set_layers(self, sprites, layer):
+        ''' Move many sprites to a layer at once, keeping their order.
+        Same result as calling set_layer(layer) on each of them. '''
+        moving = []
+        for spr in sprites:
+            if spr in self._key_of:
+                self._key_of.pop(spr)
+                self.damage(spr)
+            spr.layer = layer
+            moving.append(((layer, self._next_sequence()), spr))
+        staying = [(key, spr) for key, spr in zip(self._keys, self.list)
+                   if spr in self._key_of]
+        merged = sorted(staying + moving, key=lambda item: item[0])
+        self._keys = [key for key, spr in merged]
+        self.list = [spr for key, spr in merged]
+        for key, spr in moving:
+            self._key_of[spr] = key
+            self._index(spr)
+            spr.inval()
+
+    def _add(self, spr, key):
+        ''' Put a sprite in the list in key order and file it in the
+        spatial index. '''
+        i = bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self.list.insert(i, spr)
+        self._key_of[spr] = key
+        self._index(spr)
+
+    def enable_spatial_index(self, size=64):
+        ''' Keep sprites in buckets of size x size pixels, so that
+        find_sprite only tests the sprites near the position. '''
+        self._grid = {}
+        self._grid_size = int(max(1, size))
+        self._cells = {}
+        for spr in self.list:
+            self._index(spr)
+
+    def _index(self, spr):
+        ''' File a sprite in every bucket its rectangle touches '''
+        if self._grid is None:
+            return
+        self._unindex(spr)
+        size = self._grid_size
+        x, y, w, h = spr.rect
+        cells = []
+        for col in range(x // size, (x + w) // size + 1):
+            for row in range(y // size, (y + h) // size + 1):
+                if (col, row) not in self._grid:
+                    self._grid[(col, row)] = set()
+                self._grid[(col, row)].add(spr)
+                cells.append((col, row))
+        self._cells[spr] = cells
+
+    def _unindex(self, spr):
+        ''' Take a sprite out of the spatial index '''
+        for cell in self._cells.pop(spr, ()):
+            self._grid[cell].discard(spr)
+
+    def reindex(self, spr):
+        ''' Refile a sprite after its rectangle has changed '''
+        if spr in self._cells:
+            self._index(spr)
 
     def find_sprite(self, pos, inverse=False):
         ''' Search based on (x, y) position. Return the 'top/first' one. '''
+        if self._grid is not None:
+            cell = (int(pos[0]) // self._grid_size,
+                    int(pos[1]) // self._grid_size)
+            hits = [spr for spr in self._grid.get(cell, ()) if spr.hit(pos)]
+            if len(hits) == 0:
+                return None
+            if inverse:
+                return min(hits, key=self._key_of.__getitem__)
+            return max(hits, key=self._key_of.__getitem__)
         list = self.list[:]
         if not inverse:
             list.reverse()
@@ -136,8 +252,91 @@ class Sprites:
                 return spr
         return None
 
+    def get_layout(self, cr, text, font, size, fit_width=None, rescale=True):
+        ''' Return (layout, width, height) for a label, building the
+        Pango layout only the first time that text, font, size and
+        width are asked for. Text wider than fit_width is shrunk if
+        rescale is set, otherwise it is ellipsized at the start. '''
+        key = (text, font, size, fit_width, rescale)
+        if key in self._layouts:
+            self._layouts.move_to_end(key)
+            return self._layouts[key]
+        pl = PangoCairo.create_layout(cr)
+        pl.set_text(text, -1)
+        fd = Pango.FontDescription(font)
+        fd.set_size(int(size * Pango.SCALE))
+        pl.set_font_description(fd)
+        w = pl.get_size()[0] / Pango.SCALE
+        if fit_width is not None and w > fit_width:
+            if rescale:
+                fd.set_size(int(size * Pango.SCALE * fit_width / w))
+                pl.set_font_description(fd)
+            else:
+                pl.set_width(int(fit_width * Pango.SCALE))
+                pl.set_ellipsize(Pango.EllipsizeMode.START)
+            w = pl.get_size()[0] / Pango.SCALE
+        layout = (pl, w, pl.get_size()[1] / Pango.SCALE)
+        if self.counters is not None:
+            self.counters.count('layouts-built')
+        self._layouts[key] = layout
+        if len(self._layouts) > LAYOUT_CACHE_SIZE:
+            self._layouts.popitem(last=False)
+        return layout
+
+    def set_static_layers(self, top_layer):
+        ''' Retain the sprites in layers up to and including top_layer
+        in an offscreen surface. Each redraw then blits that surface and
+        draws only the sprites above it. Use None to turn this off. '''
+        self._static_layer = top_layer
+        self._static_surface = None
+        self._static_damage = []
+
+    def damage(self, spr):
+        ''' Note that a retained sprite has changed where it is now '''
+        if self._static_layer is not None and \
+           spr.layer <= self._static_layer and \
+           spr.rect[2] > 0 and spr.rect[3] > 0:
+            self._static_damage.append(tuple(spr.rect))
+
+    def _refresh_static_surface(self, cr):
+        ''' Bring the damaged parts of the retained layers up to date '''
+        width = self.widget.get_allocated_width()
+        height = self.widget.get_allocated_height()
+        if self._static_surface is None or \
+           self._static_surface.get_width() != width or \
+           self._static_surface.get_height() != height:
+            self._static_surface = cairo.ImageSurface(
+                cairo.FORMAT_ARGB32, width, height)
+            self._static_damage = [(0, 0, width, height)]
+        if len(self._static_damage) == 0:
+            return
+        damage = self._static_damage
+        self._static_damage = []
+        if len(damage) > MAX_DAMAGE_RECTS:  # just redo their bounding box
+            x1 = min([area[0] for area in damage])
+            y1 = min([area[1] for area in damage])
+            x2 = max([area[0] + area[2] for area in damage])
+            y2 = max([area[1] + area[3] for area in damage])
+            damage = [(x1, y1, x2 - x1, y2 - y1)]
+        static_cr = cairo.Context(self._static_surface)
+        for area in damage:
+            static_cr.save()
+            static_cr.rectangle(*area)
+            static_cr.clip()
+            static_cr.set_operator(cairo.OPERATOR_CLEAR)
+            static_cr.paint()
+            static_cr.set_operator(cairo.OPERATOR_OVER)
+            drawn = [spr for spr in self.sprites_in(area)
+                     if spr.layer <= self._static_layer]
+            for spr in drawn:
+                spr.draw(cr=static_cr)
+            static_cr.restore()
+            if self.counters is not None:
+                self.counters.count('sprites-retained', len(drawn))
+
     def redraw_sprites(self, area=None, cr=None):
-        ''' Redraw the sprites that intersect area. '''
+        ''' Redraw the sprites that intersect area. If no area is given,
+        use the clip region of the Cairo context (the damaged area). '''
         # I think I need to do this to save Cairo some work
         if cr is None:
             cr = self.cr
@@ -146,13 +345,44 @@ class Sprites:
         if cr is None:
             print('sprites.redraw_sprites: no Cairo context')
             return
-        for spr in self.list:
-            if area == None:
-                spr.draw(cr=cr)
-            else:
-                intersection = spr.rect.intersect(area)
-                if intersection.width > 0 or intersection.height > 0:
-                    spr.draw(cr=cr)
+        if area is None:
+            x1, y1, x2, y2 = cr.clip_extents()
+            area = (x1, y1, x2 - x1, y2 - y1)
+        elif hasattr(area, 'width'):  # a Gdk.Rectangle
+            area = (area.x, area.y, area.width, area.height)
+        if self._static_layer is None:
+            drawn = self.sprites_in(area)
+        else:
+            self._refresh_static_surface(cr)
+            cr.save()
+            cr.set_source_surface(self._static_surface, 0, 0)
+            cr.rectangle(*area)
+            cr.fill()
+            cr.restore()
+            drawn = [spr for spr in self.sprites_in(area)
+                     if spr.layer > self._static_layer]
+        for spr in drawn:
+            spr.draw(cr=cr)
+        if self.counters is not None:
+            self.counters.count('sprites-drawn', len(drawn))
+
+    def sprites_in(self, area):
+        ''' Return the sprites that intersect area (x, y, w, h), in
+        drawing order. '''
+        if self._grid is not None:
+            size = self._grid_size
+            cols = range(int(area[0] // size),
+                         int((area[0] + area[2]) // size) + 1)
+            rows = range(int(area[1] // size),
+                         int((area[1] + area[3]) // size) + 1)
+            if len(cols) * len(rows) < len(self.list):
+                found = set()
+                for col in cols:
+                    for row in rows:
+                        found.update(self._grid.get((col, row), ()))
+                return sorted([spr for spr in found if spr.intersects(area)],
+                              key=self._key_of.__getitem__)
+        return [spr for spr in self.list if spr.intersects(area)]
 
 
 class Sprite:
@@ -170,6 +400,7 @@ class Sprite:
         self._x_pos = [None]
         self._y_pos = [None]
         self._fd = None
+        self._font = None
         self._bold = False
         self._italic = False
         self._color = None
@@ -205,11 +436,13 @@ class Sprite:
                 self.rect[2] = w + dx
             if h + dy > self.rect[3]:
                 self.rect[3] = h + dy
+        self._sprites.reindex(self)
 
     def move(self, pos):
         ''' Move to new (x, y) position '''
         self.inval()
         self.rect[0], self.rect[1] = int(pos[0]), int(pos[1])
+        self._sprites.reindex(self)
         self.inval()
 
     def move_relative(self, pos):
@@ -217,6 +450,7 @@ class Sprite:
         self.inval()
         self.rect[0] += int(pos[0])
         self.rect[1] += int(pos[1])
+        self._sprites.reindex(self)
         self.inval()
 
     def get_xy(self):
@@ -239,15 +473,10 @@ class Sprite:
 
     def set_layer(self, layer=None):
         ''' Set the layer for a sprite '''
-        self._sprites.remove_from_list(self)
+        self._sprites.damage(self)  # it may be leaving a retained layer
         if layer is not None:
             self.layer = layer
-        for i in range(self._sprites.length_of_list()):
-            if self.layer < self._sprites.get_sprite(i).layer:
-                self._sprites.insert_in_list(self, i)
-                self.inval()
-                return
-        self._sprites.append_to_list(self)
+        self._sprites.insert_by_layer(self)
         self.inval()
 
     def set_label(self, new_label, i=0):
@@ -281,6 +510,7 @@ class Sprite:
 
     def set_font(self, font):
         ''' Set the font for a label '''
+        self._font = font
         self._fd = Pango.FontDescription(font)
 
     def set_label_color(self, rgb):
@@ -321,6 +551,11 @@ class Sprite:
     def inval(self):
         ''' Invalidate a region for gtk '''
         # self._sprites.window.invalidate_rect(self.rect, False)
+        self._sprites.damage(self)
+        if self._sprites.counters is not None:
+            self._sprites.counters.count('queue-draw-area')
+            self._sprites.counters.count('queued-pixels',
+                                         self.rect[2] * self.rect[3])
         self._sprites.widget.queue_draw_area(self.rect[0],
                                              self.rect[1],
                                              self.rect[2],
@@ -356,6 +591,13 @@ class Sprite:
         if len(self.labels) > 0:
             self.draw_label(cr)
 
+    def intersects(self, area):
+        ''' Does the sprite overlap the rectangle (x, y, w, h)? '''
+        return self.rect[0] < area[0] + area[2] and \
+            area[0] < self.rect[0] + self.rect[2] and \
+            self.rect[1] < area[1] + area[3] and \
+            area[1] < self.rect[1] + self.rect[3]
+
     def hit(self, pos):
         ''' Is (x, y) on top of the sprite? '''
         x, y = pos
@@ -376,26 +618,9 @@ class Sprite:
             my_width = 0
         my_height = self.rect[3] - self._margins[1] - self._margins[3]
         for i in range(len(self.labels)):
-            pl = PangoCairo.create_layout(cr)
-            pl.set_text(str(self.labels[i]), -1)
-            self._fd.set_size(int(self._scale[i] * Pango.SCALE))
-            pl.set_font_description(self._fd)
-            w = pl.get_size()[0] / Pango.SCALE
-            if w > my_width:
-                if self._rescale[i]:
-                    self._fd.set_size(
-                            int(self._scale[i] * Pango.SCALE * my_width / w))
-                    pl.set_font_description(self._fd)
-                    w = pl.get_size()[0] / Pango.SCALE
-                else:
-                    j = len(self.labels[i]) - 1
-                    while(w > my_width and j > 0):
-                        pl.set_text(
-                            "…" + self.labels[i][len(self.labels[i]) - j:], -1)
-                        self._fd.set_size(int(self._scale[i] * Pango.SCALE))
-                        pl.set_font_description(self._fd)
-                        w = pl.get_size()[0] / Pango.SCALE
-                        j -= 1
+            pl, w, h = self._sprites.get_layout(
+                cr, str(self.labels[i]), self._font, self._scale[i],
+                my_width, self._rescale[i])
             if self._x_pos[i] is not None:
                 x = int(self.rect[0] + self._x_pos[i])
             elif self._horiz_align[i] == "center":
@@ -404,7 +629,6 @@ class Sprite:
                 x = int(self.rect[0] + self._margins[0])
             else: # right
                 x = int(self.rect[0] + self.rect[2] - w - self._margins[2])
-            h = pl.get_size()[1] / Pango.SCALE
             if self._y_pos[i] is not None:
                 y = int(self.rect[1] + self._y_pos[i])
             elif self._vert_align[i] == "middle":
@@ -426,11 +650,8 @@ class Sprite:
             cr = self._sprites.cr
         max = 0
         for i in range(len(self.labels)):
-            pl = PangoCairo.create_layout(cr)
-            pl.set_text(str(self.labels[i]), -1)
-            self._fd.set_size(int(self._scale[i] * Pango.SCALE))
-            pl.set_font_description(self._fd)
-            w = pl.get_size()[0] / Pango.SCALE
+            pl, w, h = self._sprites.get_layout(
+                cr, str(self.labels[i]), self._font, self._scale[i])
             if w > max:
                 max = w
         return max
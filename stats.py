@@ -0,0 +1,169 @@
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+stats.py keeps the outcome of every game, by level and strategy.
+
+The games are kept in an append-only file, one line of JSON per game:
+
+    {"time": ..., "level": 2, "strategy": "3f0c...", "won": true,
+     "seconds": 41.5, "moves": 12}
+
+The file is read once, in a thread, into an index in memory; queries
+are answered from the index and never touch the disk. New games are
+added to the index straight away and written out by a thread, a batch
+at a time, each batch in a single write. A line cut short by a crash
+is skipped when the file is read back.
+'''
+
+import json
+import os
+import threading
+
+from bisect import insort
+
+import logging
+_logger = logging.getLogger('turtle-in-a-pond-activity')
+
+
+class LevelStats():
+    ''' The games played at one level with one strategy '''
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.moves = 0
+        self.streak = 0  # games won in a row, up to the last one
+        self.best_streak = 0
+        self.times = []  # seconds taken by the games won, sorted
+
+    def add(self, won, seconds, moves):
+        self.games += 1
+        self.moves += moves
+        if won:
+            self.wins += 1
+            self.streak += 1
+            self.best_streak = max(self.best_streak, self.streak)
+            insort(self.times, seconds)
+        else:
+            self.streak = 0
+
+    def best(self):
+        ''' The fastest win in seconds, or None '''
+        return self.times[0] if len(self.times) > 0 else None
+
+    def median(self):
+        ''' The median time to win in seconds, or None '''
+        n = len(self.times)
+        if n == 0:
+            return None
+        if n % 2 == 1:
+            return self.times[n // 2]
+        return (self.times[n // 2 - 1] + self.times[n // 2]) / 2.
+
+
+class StatsStore():
+    ''' Game outcomes by (level, strategy hash) '''
+
+    def __init__(self, path):
+        self._path = path
+        self._index = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer = None
+        self._cut_short = False
+        self._loaded = threading.Event()
+        loader = threading.Thread(target=self._load)
+        loader.daemon = True
+        loader.start()
+
+    def _load(self):
+        records = []
+        try:
+            with open(self._path, 'r') as fp:
+                for line in fp:
+                    # A crash may have cut the last line short
+                    self._cut_short = not line.endswith('\n')
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        _logger.debug('skipped a bad line in the stats')
+        except (OSError, UnicodeDecodeError) as e:
+            _logger.debug('no stats: {}'.format(e))
+        with self._lock:
+            # Games recorded while loading are still pending: nothing
+            # is written until the file has been read
+            self._index = {}
+            for record in records + self._pending:
+                try:
+                    self._add(record)
+                except (KeyError, TypeError):
+                    _logger.debug('skipped a bad game in the stats')
+        self._loaded.set()
+
+    def _add(self, record):
+        key = (record['level'], record['strategy'])
+        if key not in self._index:
+            self._index[key] = LevelStats()
+        self._index[key].add(record['won'], record['seconds'],
+                             record['moves'])
+
+    def record(self, level, strategy, won, seconds, moves, when):
+        ''' Add a game; it is written out in the background '''
+        record = {'time': round(when, 1), 'level': level,
+                  'strategy': strategy, 'won': bool(won),
+                  'seconds': round(seconds, 1), 'moves': moves}
+        with self._lock:
+            self._add(record)
+            self._pending.append(record)
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run)
+            self._writer.daemon = True
+            self._writer.start()
+        self._wake.set()
+
+    def get(self, level, strategy):
+        ''' Return the LevelStats for a level and strategy, or None if
+        no games have been played with them (yet, if still loading) '''
+        with self._lock:
+            return self._index.get((level, strategy))
+
+    def wait_loaded(self, timeout=None):
+        ''' Wait for the file to be read; True if it has been '''
+        return self._loaded.wait(timeout)
+
+    def flush(self):
+        ''' Write out the games not yet written '''
+        self._loaded.wait()
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if len(batch) == 0:
+                return
+            text = ''.join([json.dumps(record) + '\n' for record in batch])
+            if self._cut_short:
+                text = '\n' + text
+                self._cut_short = False
+            try:
+                with open(self._path, 'a') as fp:
+                    fp.write(text)
+                    fp.flush()
+                    os.fsync(fp.fileno())
+            except OSError as e:
+                _logger.debug('cannot write the stats: {}'.format(e))
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+strategyworker.py runs custom strategies in a separate Python process,
+so that a strategy that loops forever or eats all the memory cannot
+freeze the activity.
+
+The worker is started once and reused. Each request and reply is one
+line of JSON on its stdin/stdout:
+
+    {"op": "load", "hash": ..., "source": ...}  -> {"ok": true}
+    {"op": "move", "hash": ..., "pond": {"width": 13, ...},
+     "cells": "eeoob...", "turtle": 84,
+     "orientation": 0}                           -> {"move": [6, 5],
+                                                     "orientation": 1}
+
+A move request with "profile": true runs the strategy under
+profiler.profile_call and adds its record to the reply as "profile";
+any failure is returned as {"error": message}. Each move has a
+CPU time limit and the whole process has a memory limit; if the
+worker does not answer in time it is killed and a fresh one started.
+'''
+
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from board import Board, Pond, load_strategy, forget_strategy, strategy_hash, \
+    error_message
+from profiler import profile_call
+
+MOVE_TIME_LIMIT = 0.5  # seconds of CPU per move
+MEMORY_LIMIT = 256 * 1024 * 1024  # bytes of address space
+STARTUP_TIME_LIMIT = 5.0
+
+import logging
+_logger = logging.getLogger('turtle-in-a-pond-activity')
+
+
+class StrategyError(Exception):
+    ''' The strategy failed; the message is ready for the status label '''
+
+
+class StrategyTimeout(StrategyError):
+    ''' The strategy did not answer in time '''
+
+
+class StrategyWorker():
+    ''' A persistent process that runs custom strategies '''
+
+    def __init__(self, time_limit=MOVE_TIME_LIMIT, memory_limit=MEMORY_LIMIT):
+        self._time_limit = time_limit
+        self._memory_limit = memory_limit
+        self._process = None
+        self._known = set()  # strategy hashes the worker has compiled
+        self.last_profile = None
+        # Loads come from the main loop and moves from a thread: one
+        # request and its reply at a time on the pipe
+        self._lock = threading.RLock()
+        self.start()
+
+    def start(self):
+        ''' Start (or restart) the worker process '''
+        self.stop()
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__),
+             str(self._time_limit), str(self._memory_limit)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            universal_newlines=True, bufsize=1,
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        self._known = set()
+
+    def stop(self):
+        ''' Stop the worker process '''
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def load(self, source):
+        ''' Compile a strategy in the worker. Raises StrategyError. '''
+        key = strategy_hash(source)
+        with self._lock:
+            self._request({'op': 'load', 'hash': key, 'source': source},
+                          STARTUP_TIME_LIMIT)
+            # The worker keeps only the strategy it loaded last
+            self._known = {key}
+
+    def move(self, source, board, profile=False):
+        ''' Ask the strategy for the turtle's next (col, row) and
+        orientation. Raises StrategyError or StrategyTimeout. With
+        profile set, the move's profile is left in last_profile. '''
+        key = strategy_hash(source)
+        cells, turtle, orientation = board.get_snapshot()
+        with self._lock:
+            if key not in self._known:
+                self.load(source)
+            self.last_profile = None
+            reply = self._request({'op': 'move', 'hash': key,
+                                   'pond': board.get_pond().describe(),
+                                   'cells': cells, 'turtle': turtle,
+                                   'orientation': orientation,
+                                   'profile': profile},
+                                  self._time_limit * 2 + 0.25)
+            self.last_profile = reply.get('profile')
+        return reply['move'], reply['orientation']
+
+    def _request(self, request, time_limit):
+        if self._process is None or self._process.poll() is not None:
+            self.start()
+        start = time.time()
+        crashed = False
+        try:
+            self._process.stdin.write(json.dumps(request) + '\n')
+            self._process.stdin.flush()
+            ready, _, _ = select.select([self._process.stdout], [], [],
+                                        time_limit)
+            line = self._process.stdout.readline() if ready else ''
+            # Readable but empty is the end of the pipe: it died
+            crashed = len(ready) > 0
+        except (OSError, ValueError):
+            line = ''
+            crashed = True  # the pipe is broken
+        if line == '':
+            # Hung or crashed: throw it away and have a new one ready
+            elapsed = int((time.time() - start) * 1000)
+            self.start()
+            if crashed:
+                raise StrategyError('strategy crashed the worker')
+            raise StrategyTimeout(
+                'strategy timed out after {} ms'.format(elapsed))
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise StrategyError(reply['error'])
+        return reply
+
+
+class _CPUTimeout(Exception):
+    pass
+
+
+def _cpu_timeout(signum, frame):
+    raise _CPUTimeout()
+
+
+def _serve(time_limit, memory_limit):
+    ''' The worker side: answer requests until stdin is closed '''
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except (ImportError, ValueError, OSError):
+        pass
+    signal.signal(signal.SIGPROF, _cpu_timeout)
+    # Keep the replies to ourselves: strategies may print
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    sys.stdout = sys.stderr
+    board = Board()
+    strategies = {}
+    for line in sys.stdin:
+        request = json.loads(line)
+        try:
+            signal.setitimer(signal.ITIMER_PROF, time_limit)
+            try:
+                if request['op'] == 'load':
+                    function = load_strategy(request['source'])
+                    for source, old in strategies.values():
+                        forget_strategy(source)  # replaced
+                    strategies = {request['hash']:
+                                  (request['source'], function)}
+                    reply = {'ok': True}
+                else:
+                    pond = Pond.from_description(request['pond'])
+                    if pond != board.get_pond():
+                        board = Board(pond)
+                    board.set_snapshot(request['cells'], request['turtle'],
+                                       request['orientation'])
+                    function = strategies[request['hash']][1]
+                    turtle = board._dot_to_grid(board.get_turtle())
+                    if request.get('profile'):
+                        move, profile = profile_call(function, board, turtle)
+                    else:
+                        move, profile = function(board, turtle), None
+                    reply = {'move': [int(move[0]), int(move[1])],
+                             'orientation': int(board.get_orientation())}
+                    if profile is not None:
+                        reply['profile'] = profile
+            finally:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+        except _CPUTimeout:
+            reply = {'error': 'strategy timed out after {} ms'.format(
+                int(time_limit * 1000))}
+        except MemoryError:
+            reply = {'error': 'strategy ran out of memory'}
+        except BaseException as e:
+            reply = {'error': error_message(e)}
+        replies.write(json.dumps(reply) + '\n')
+        replies.flush()
+
+
+if __name__ == '__main__':
+    _serve(float(sys.argv[1]), int(sys.argv[2]))
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+#Copyright (c) 2026 Turtle in a Pond contributors
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+'''
+tournament.py plays turtle strategies against automated players,
+without a display, e.g.
+
+    python3 tournament.py --games 1000 --seed 7 my_strategy.py
+
+Each (strategy, player) pairing plays the same number of games. Every
+game is seeded from the base seed, the pairing and the game number,
+so results do not depend on how games are spread over the worker
+processes.
+
+Players are classes with a choose(board) method that returns the dot
+to block; add new ones to PLAYERS.
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from collections import deque
+from multiprocessing import Pool
+
+from board import Board, Pond, load_strategy, BEGINNER_STRATEGY, \
+    INTERMEDIATE_STRATEGY, EXPERT_STRATEGY, MASTER_STRATEGY, NOT_OVER, \
+    ESCAPED, TRAPPED, THIRTEEN
+
+STRATEGIES = [('beginner', BEGINNER_STRATEGY),
+              ('intermediate', INTERMEDIATE_STRATEGY),
+              ('expert', EXPERT_STRATEGY)]
+CHUNK_SIZE = 50
+# The solver is limited by positions searched, not time, so that
+# results do not depend on the speed of the machine
+SOLVER_NODES = 2000
+ERROR = -1
+
+
+def _open_dots(board):
+    return [dot for dot in range(board.number_of_dots())
+            if board.get_type(dot) is False and dot != board.get_turtle()]
+
+
+class RandomPlayer():
+    ''' Blocks any open dot '''
+
+    def __init__(self, rng):
+        self._rng = rng
+
+    def choose(self, board):
+        dots = _open_dots(board)
+        if len(dots) == 0:
+            return None
+        return self._rng.choice(dots)
+
+
+class GreedyPlayer(RandomPlayer):
+    ''' Blocks the turtle's neighbor that is closest to an edge '''
+
+    def choose(self, board):
+        turtle = board._dot_to_grid(board.get_turtle())
+        for dot in board._ordered_weights(turtle):
+            if board.get_type(dot) is False:
+                return dot
+        return RandomPlayer.choose(self, board)
+
+
+class LookaheadPlayer(RandomPlayer):
+    ''' Tries blocking each open dot within two steps of the turtle and
+    keeps the one that leaves the turtle furthest from an edge '''
+
+    def choose(self, board):
+        turtle = board.get_turtle()
+        candidates = []
+        for near in board._neighborhoods[turtle]:
+            for dot in (near,) + board._neighborhoods[near]:
+                if board.get_type(dot) is False and dot != turtle and \
+                   dot not in candidates:
+                    candidates.append(dot)
+        if len(candidates) == 0:
+            return RandomPlayer.choose(self, board)
+        best = None
+        for dot in candidates:
+            score = (self._escape(board, turtle, dot), self._rng.random())
+            if best is None or score > best[0]:
+                best = (score, dot)
+        return best[1]
+
+    def _escape(self, board, turtle, blocked):
+        ''' Steps from the turtle to an edge if blocked were blocked '''
+        steps = {turtle: 0}
+        queue = deque([turtle])
+        while queue:
+            dot = queue.popleft()
+            for neighbor in board._neighborhoods[dot]:
+                if neighbor in steps or neighbor == blocked:
+                    continue
+                if board.get_type(neighbor) is None:
+                    return steps[dot] + 1
+                if board.get_type(neighbor) is False:
+                    steps[neighbor] = steps[dot] + 1
+                    queue.append(neighbor)
+        return board.number_of_dots()  # no way out
+
+
+class SolverPlayer(RandomPlayer):
+    ''' Blocks the dot the solver picks '''
+
+    def choose(self, board):
+        dot = board._best_block()
+        if dot is None:
+            return RandomPlayer.choose(self, board)
+        return dot
+
+
+PLAYERS = {'random': RandomPlayer,
+           'greedy': GreedyPlayer,
+           'lookahead': LookaheadPlayer,
+           'solver': SolverPlayer}
+# The solver is slow; ask for it by name
+DEFAULT_PLAYERS = ['greedy', 'lookahead', 'random']
+
+
+def play_game(source, player_name, seed, pond=None, nodes=SOLVER_NODES):
+    ''' Play one game. Returns (result, moves), where result is
+    ESCAPED, TRAPPED, NOT_OVER (nothing left to block) or ERROR. '''
+    random.seed(seed)  # the strategies use the random module
+    player = PLAYERS[player_name](random.Random(seed + ':player'))
+    board = Board(pond)
+    board.set_search_limits(None, nodes)
+    board.new_game()
+    try:
+        strategy = load_strategy(source)
+        while True:
+            dot = player.choose(board)
+            if dot is None:
+                return NOT_OVER, board.moves
+            board.block(dot)
+            new_dot = board.move_turtle(
+                strategy(board, board._dot_to_grid(board.get_turtle())))
+            result = board.test_game_over(new_dot)
+            if result != NOT_OVER:
+                return result, board.moves
+    except Exception:
+        return ERROR, board.moves
+
+
+def _play_chunk(task):
+    ''' Worker: play games first to last of one pairing '''
+    strategy_name, source, player_name, base_seed, first, last, pond, \
+        nodes = task
+    results = []
+    for game in range(first, last):
+        seed = '{}:{}:{}:{}'.format(base_seed, strategy_name, player_name,
+                                    game)
+        results.append(play_game(source, player_name, seed, pond, nodes))
+    return strategy_name, player_name, results
+
+
+def run(strategies, players, games, seed, processes=None, pond=None,
+        nodes=SOLVER_NODES):
+    ''' Play every pairing and return {(strategy, player): results} '''
+    tasks = []
+    for strategy_name, source in strategies:
+        for player_name in players:
+            for first in range(0, games, CHUNK_SIZE):
+                tasks.append((strategy_name, source, player_name, seed,
+                              first, min(first + CHUNK_SIZE, games), pond,
+                              nodes))
+    results = {}
+    with Pool(processes) as pool:
+        for strategy_name, player_name, chunk in \
+                pool.imap_unordered(_play_chunk, tasks):
+            results.setdefault((strategy_name, player_name), []).extend(
+                chunk)
+    return results
+
+
+def report(results, elapsed):
+    ''' Print a table of the results '''
+    print('{:16} {:10} {:>7} {:>8} {:>8} {:>10} {:>7}'.format(
+        'strategy', 'player', 'games', 'win', 'escape', 'capture in',
+        'errors'))
+    total = 0
+    for (strategy_name, player_name), games in sorted(results.items()):
+        trapped = [moves for result, moves in games if result == TRAPPED]
+        escaped = len([1 for result, moves in games if result == ESCAPED])
+        errors = len([1 for result, moves in games if result == ERROR])
+        if len(trapped) > 0:
+            capture = '{:.1f}'.format(sum(trapped) / float(len(trapped)))
+        else:
+            capture = '-'
+        print('{:16} {:10} {:7d} {:7.1f}% {:7.1f}% {:>10} {:7d}'.format(
+            strategy_name, player_name, len(games),
+            100. * len(trapped) / len(games), 100. * escaped / len(games),
+            capture, errors))
+        total += len(games)
+    print('{} games in {:.2f} s: {:.0f} games per second'.format(
+        total, elapsed, total / max(elapsed, 1e-9)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Play turtle strategies against automated players.')
+    parser.add_argument('files', nargs='*',
+                        help='custom strategy files (Python source)')
+    parser.add_argument('--games', type=int, default=100,
+                        help='games per pairing (default 100)')
+    parser.add_argument('--seed', default='0',
+                        help='base seed (default 0)')
+    parser.add_argument('--players', default=','.join(DEFAULT_PLAYERS),
+                        help='comma-separated players: {} (default {})'.format(
+                            ', '.join(sorted(PLAYERS)),
+                            ','.join(DEFAULT_PLAYERS)))
+    parser.add_argument('--master', action='store_true',
+                        help='play the master (solver) strategy too')
+    parser.add_argument('--nodes', type=int, default=SOLVER_NODES,
+                        help='positions the solver searches per move '
+                        '(default {})'.format(SOLVER_NODES))
+    parser.add_argument('--width', type=int, default=THIRTEEN,
+                        help='pond width (default 13)')
+    parser.add_argument('--height', type=int, default=THIRTEEN,
+                        help='pond height (default 13)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes (default one per core)')
+    args = parser.parse_args(argv)
+
+    strategies = list(STRATEGIES)
+    if args.master:
+        strategies.append(('master', MASTER_STRATEGY))
+    for file_path in args.files:
+        with open(file_path, 'r') as fp:
+            strategies.append((os.path.basename(file_path), fp.read()))
+    players = args.players.split(',')
+    for player_name in players:
+        if player_name not in PLAYERS:
+            parser.error('unknown player {}'.format(player_name))
+
+    try:
+        pond = Pond(args.width, args.height)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.time()
+    results = run(strategies, players, args.games, args.seed,
+                  args.processes, pond, args.nodes)
+    report(results, time.time() - start)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())